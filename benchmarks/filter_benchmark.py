@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# Measures FilterEngine compile time, cache load time and lookups per second.
+# Usage: python benchmarks/filter_benchmark.py [--rules filters/easylist.txt ...] [--corpus urls.txt]
+# A corpus file has one request per line: "url [resource type] [first party url]", separated by whitespace.
+# Without --rules or --corpus, a synthetic rule list and request corpus of similar shape are generated.
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from main import FilterEngine
+
+TYPES = ("script", "image", "stylesheet", "xmlhttprequest", "subdocument", "font", "other")
+
+def make_rules(count, rng):
+    words = [f"{rng.choice(('ad', 'track', 'pixel', 'banner', 'stat', 'beacon', 'promo'))}{i}" for i in range(count // 4)]
+    rules = []
+    for i in range(count):
+        kind = rng.random()
+        if kind < 0.6: rules.append(f"||{rng.choice(words)}-{i}.{rng.choice(('com', 'net', 'io'))}^" + rng.choice(("", "$third-party", "$script,image")))
+        elif kind < 0.9: rules.append(f"/{rng.choice(words)}/{rng.choice(words)}_*." + rng.choice(("js", "gif", "png")))
+        elif kind < 0.97: rules.append(f"&{rng.choice(words)}=")
+        else: rules.append(f"@@||cdn{i}.example.com^$script")
+    return rules
+
+def make_corpus(count, rules, rng):
+    hosts = [f"cdn{i}.site{i % 300}.com" for i in range(3000)]
+    blocked_hosts = [rule[2:].split("^")[0] for rule in rules if rule.startswith("||")]
+    corpus = []
+    for _ in range(count):
+        host = rng.choice(blocked_hosts) if rng.random() < 0.1 else rng.choice(hosts)
+        path = "/".join(rng.choice(("static", "js", "img", "v2", "assets", "api", "media")) for _ in range(rng.randint(1, 4)))
+        corpus.append((f"https://{host}/{path}/file{rng.randint(0, 99999)}.js?v={rng.randint(0, 999)}", rng.choice(TYPES), f"https://www.site{rng.randint(0, 299)}.com/"))
+    return corpus
+
+def read_corpus(path):
+    corpus = []
+    with open(path, encoding="utf-8") as lines:
+        for line in lines:
+            fields = line.split()
+            if fields: corpus.append((fields[0], fields[1] if len(fields) > 1 else "other", fields[2] if len(fields) > 2 else ""))
+    return corpus
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rules", nargs="*", default=[]); parser.add_argument("--corpus")
+    parser.add_argument("--synthetic-rules", type=int, default=60000); parser.add_argument("--synthetic-requests", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp()
+    paths = args.rules
+    if not paths:
+        rules = make_rules(args.synthetic_rules, rng); paths = [os.path.join(workdir, "synthetic.txt")]
+        with open(paths[0], "w") as rule_file: rule_file.write("\n".join(rules))
+    else:
+        rules = [line.strip() for path in paths for line in open(path, encoding="utf-8", errors="replace")]
+    corpus = read_corpus(args.corpus) if args.corpus else make_corpus(args.synthetic_requests, rules, rng)
+    requests = [(url, urlsplit(url).hostname or "", kind, first_party, urlsplit(first_party).hostname or "") for url, kind, first_party in corpus]
+
+    cache_path = os.path.join(workdir, "compiled.cache")
+    start = time.perf_counter(); engine = FilterEngine.load(paths, cache_path); compile_time = time.perf_counter() - start
+    start = time.perf_counter(); engine = FilterEngine.load(paths, cache_path); cache_time = time.perf_counter() - start
+
+    for url, host, kind, first_party, first_party_host in requests: engine.should_block(url, host, kind, first_party, first_party_host)  # compile regexes
+    start = time.perf_counter(); blocked = 0
+    for url, host, kind, first_party, first_party_host in requests: blocked += engine.should_block(url, host, kind, first_party, first_party_host)
+    elapsed = time.perf_counter() - start
+
+    print(f"rules: {len(engine)}  requests: {len(requests)}  blocked: {blocked}")
+    print(f"compile: {compile_time * 1000:.0f} ms  load from cache: {cache_time * 1000:.0f} ms")
+    print(f"lookups: {len(requests) / elapsed:,.0f}/s  ({elapsed / len(requests) * 1e6:.1f} us per request)")
+
+if __name__ == "__main__":
+    main()
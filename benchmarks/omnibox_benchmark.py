@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# Measures omnibox suggestion latency and memory of UrlIndex over a synthetic history.
+# Usage: python benchmarks/omnibox_benchmark.py [--entries 100000] [--max-entries 20000] [--queries 20000]
+
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from main import UrlIndex, DatabaseManager
+
+SYLLABLES = ("ka", "lo", "mi", "ne", "ra", "to", "su", "vi", "de", "po", "an", "el", "ir", "on", "ul", "be", "ta", "go", "fi", "ze")
+TLDS = ("com", "org", "net", "de", "io", "dev")
+
+def make_vocabulary(size, rng):
+    words = set()
+    while len(words) < size: words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+def make_history(count, rng):
+    # Word and domain popularity follow a Zipf-like distribution, as in real browsing history.
+    vocabulary = make_vocabulary(5000, rng)
+    word_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    domains = [f"{word}.{rng.choice(TLDS)}" for word in rng.sample(vocabulary, 2000)]
+    domain_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(domains))))
+    now = time.time() / DatabaseManager.FRECENCY_HALF_LIFE
+    history = []
+    for i in range(count):
+        domain = rng.choices(domains, cum_weights=domain_weights)[0]
+        path = "/".join(rng.choices(vocabulary, cum_weights=word_weights, k=rng.randint(0, 3)))
+        url = f"https://www.{domain}/{path}?id={i}"
+        title = " ".join(word.capitalize() for word in rng.choices(vocabulary, cum_weights=word_weights, k=rng.randint(2, 8)))
+        history.append((url, title, now - rng.expovariate(0.5)))
+    return history
+
+def make_queries(history, count, rng):
+    # Replay typing: every prefix of the domain or title words the user would type.
+    queries = []
+    while len(queries) < count:
+        url, title, _ = rng.choice(history)
+        target = rng.choice((url.split("//www.", 1)[1], title.lower()))[:rng.randint(4, 16)]
+        queries.extend(target[:i] for i in range(1, len(target) + 1))
+    return queries[:count]
+
+def percentile(samples, p): return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=100000); parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--max-entries", type=int, default=UrlIndex.MAX_ENTRIES, help="index cap, omnibox_index_entries in config.ini")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    history = make_history(args.entries, rng)
+    bookmarks = [(url, title) for url, title, _ in rng.sample(history, min(len(history), 500))]
+
+    # Like DatabaseManager.build_url_index, only the max_entries most frecent history entries are loaded.
+    loaded = sorted(history, key=lambda entry: entry[2], reverse=True)[:args.max_entries]
+    index = UrlIndex(max_entries=args.max_entries)
+    start = time.perf_counter(); index.load(loaded, bookmarks); build = time.perf_counter() - start
+    # Measured on a second build, since tracing slows the build down.
+    tracemalloc.start(); traced = UrlIndex(max_entries=args.max_entries); traced.load(loaded, bookmarks)
+    memory, peak = tracemalloc.get_traced_memory(); tracemalloc.stop(); del traced
+
+    samples = []
+    for query in make_queries(history, args.queries, rng):
+        start = time.perf_counter_ns(); index.search(query); samples.append(time.perf_counter_ns() - start)
+    samples.sort()
+
+    start = time.perf_counter()
+    for url, title, _ in history[:1000]: index.visit(url, title)
+    visit = (time.perf_counter() - start) / 1000
+
+    print(f"entries: {len(index)}  tokens: {len(index.tokens)}  hot prefixes: {len(index.hot)}")
+    print(f"build: {build * 1000:.0f} ms  incremental visit: {visit * 1e6:.1f} us  memory: {memory / 2**20:.0f} MB (peak {peak / 2**20:.0f} MB)")
+    print(f"suggest over {len(samples)} keystrokes: p50 {percentile(samples, 50) / 1000:.1f} us  p95 {percentile(samples, 95) / 1000:.1f} us  "
+          f"p99 {percentile(samples, 99) / 1000:.1f} us  max {samples[-1] / 1000:.1f} us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# Headless benchmark suite for SecureBrowser and DatabaseManager. Results are written as JSON so that runs can be compared.
+# Usage: python benchmarks/run_benchmarks.py [--suite navigation tabs memory database] [--output results.json]
+#
+# navigation: cold loads, warm loads in the same process and warm loads after a browser restart, served by a local
+#             http.server, once with the memory and once with the disk HttpCacheType
+# tabs:       tab open/close rate
+# memory:     RSS of the browser and its renderer processes as the tab count grows
+# database:   DatabaseManager insert and query throughput
+
+import argparse
+import functools
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, ROOT)
+from PyQt5.QtCore import QEvent, QEventLoop, QTimer, QUrl, QT_VERSION_STR, PYQT_VERSION_STR
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtWebEngineWidgets import QWebEngineProfile
+from main import DatabaseManager, SecureBrowser, percentile
+
+FIXTURE_PAGES = 10
+
+def write_fixtures(directory):
+    # Each page pulls a stylesheet, two scripts and a few images, like a small real site.
+    with open(os.path.join(directory, "style.css"), "w") as f: f.write("body { font-family: sans-serif; }\n" * 2000)
+    for i in range(2):
+        with open(os.path.join(directory, f"app{i}.js"), "w") as f: f.write("var data = [%s];\n" % ",".join(str(n) for n in range(20000)))
+    for i in range(4):
+        with open(os.path.join(directory, f"image{i}.svg"), "w") as f:
+            f.write('<svg xmlns="http://www.w3.org/2000/svg" width="200" height="200">' + "".join(f'<circle cx="{n % 200}" cy="{n // 2 % 200}" r="3"/>' for n in range(2000)) + "</svg>")
+    for page in range(FIXTURE_PAGES):
+        with open(os.path.join(directory, f"page{page}.html"), "w") as f:
+            f.write(f"<!doctype html><html><head><title>Fixture {page}</title><link rel=stylesheet href=style.css>"
+                    "<script src=app0.js></script><script src=app1.js></script></head><body>"
+                    + "".join(f"<img src=image{i}.svg>" for i in range(4)) + f"<p>{'lorem ipsum ' * 2000}</p></body></html>")
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+    def __init__(self, directory, latency):
+        self.latency = latency; self.requests = 0; self.lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), functools.partial(FixtureHandler, directory=directory))
+    @property
+    def base_url(self): return f"http://127.0.0.1:{self.server_address[1]}/"
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    # /<prefix>/page0.html serves page0.html; a new prefix gives a set of URLs that no cache has seen yet.
+    def end_headers(self):
+        self.send_header("Cache-Control", "max-age=3600"); super().end_headers()
+    def translate_path(self, path):
+        return super().translate_path("/" + path.lstrip("/").split("/", 1)[-1])
+    def do_GET(self):
+        with self.server.lock: self.server.requests += 1
+        time.sleep(self.server.latency); super().do_GET()
+    def log_message(self, *args): pass
+
+def wait_for(signal, timeout=30.0):
+    loop = QEventLoop(); result = []
+    def done(*args): result.append(args); loop.quit()
+    signal.connect(done); QTimer.singleShot(int(timeout * 1000), loop.quit); loop.exec_(); signal.disconnect(done)
+    if not result: raise TimeoutError("timed out waiting for the page to load")
+    return result[0]
+
+def process_rss_mb(pid):
+    return SecureBrowser.process_memory_mb(pid) if pid else 0.0
+
+def make_browser(workdir, disk_cache):
+    with open(os.path.join(workdir, "config.ini"), "w") as config:
+        config.write("[settings]\nhomepage = about:blank\nforce_https = False\n[tabs]\nrestore_session = False\n"
+                     f"[privacy]\ncookie_policy = 0\ncontent_blocking = False\n[performance]\npersistent_cache = {disk_cache}\n"
+                     "memory_budget_mb = 1000000\nfreeze_after_seconds = 1000000\n")
+    window = SecureBrowser(DatabaseManager(os.path.join(workdir, "browser_data.db")))
+    if disk_cache: window.profile.setCachePath(os.path.join(workdir, "cache"))
+    assert window.profile.httpCacheType() == (QWebEngineProfile.DiskHttpCache if disk_cache else QWebEngineProfile.MemoryHttpCache)
+    wait_for(window.active_browser().loadFinished)
+    return window
+
+def close_browser(window):
+    window.close(); window.deleteLater(); QApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+    # Give Chromium time to write the disk cache index and release the profile before it is opened again.
+    loop = QEventLoop(); QTimer.singleShot(1000, loop.quit); loop.exec_()
+
+def load(window, url):
+    browser = window.active_browser(); start = time.perf_counter()
+    browser.setUrl(QUrl(url)); ok, = wait_for(browser.loadFinished)
+    return (time.perf_counter() - start) * 1000, ok
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {"n": len(samples), "p50_ms": percentile(samples, 0.5), "p95_ms": percentile(samples, 0.95), "mean_ms": sum(samples) / len(samples) if samples else None}
+
+def bench_navigation(workdir, server, rounds):
+    # Every round loads pages under a new URL prefix, so the cold loads are guaranteed misses without relying on
+    # clearHttpCache, which is asynchronous. The same URLs are then loaded again in the same browser ("warm") and
+    # in a new browser on the same cache path ("restart"), which is where the disk cache should differ from memory.
+    results = {}
+    for disk_cache in (False, True):
+        name = "disk" if disk_cache else "memory"
+        samples = {"cold": [], "warm": [], "restart": []}; requests = dict.fromkeys(samples, 0)
+        def measure(window, phase, url):
+            before = server.requests; samples[phase].append(load(window, url)[0]); requests[phase] += server.requests - before
+            load(window, "about:blank")
+        for round_ in range(rounds):
+            urls = [f"{server.base_url}{name}{round_}/page{page}.html" for page in range(FIXTURE_PAGES)]
+            window = make_browser(workdir, disk_cache)
+            for url in urls: measure(window, "cold", url); measure(window, "warm", url)
+            close_browser(window)
+            window = make_browser(workdir, disk_cache)
+            for url in urls: measure(window, "restart", url)
+            close_browser(window)
+        results[name] = {phase: summarize(values) for phase, values in samples.items()}
+        # Cold loads fetch every resource; cached loads should fetch none.
+        results[name]["server_requests"] = requests
+    return results
+
+def bench_tabs(workdir, server, count):
+    window = make_browser(workdir, False)
+    start = time.perf_counter()
+    for _ in range(count):
+        page = window.add_new_tab(QUrl(f"{server.base_url}page0.html")); wait_for(page.loadFinished)
+    opened = time.perf_counter() - start
+    start = time.perf_counter()
+    while window.tabs.count() > 1: window.close_tab(window.tabs.count() - 1); QApplication.processEvents()
+    closed = time.perf_counter() - start
+    close_browser(window)
+    return {"tabs": count, "open_per_s": count / opened, "close_per_s": count / closed, "open_ms_per_tab": opened / count * 1000}
+
+def bench_memory(workdir, server, max_tabs):
+    window = make_browser(workdir, False); series = []
+    for tabs in range(1, max_tabs + 1):
+        page = window.add_new_tab(QUrl(f"{server.base_url}page{tabs % FIXTURE_PAGES}.html")); wait_for(page.loadFinished)
+        pids = {window.tabs.widget(i).page().renderProcessPid() for i in range(window.tabs.count())}
+        renderers = sum(process_rss_mb(pid) for pid in pids)
+        series.append({"tabs": tabs, "browser_rss_mb": process_rss_mb(os.getpid()), "renderer_rss_mb": renderers, "renderer_processes": len(pids - {0})})
+    close_browser(window)
+    return series
+
+def bench_database(workdir, entries):
+    path = os.path.join(workdir, "database_bench.db"); results = {}
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix): os.remove(path + suffix)
+    db = DatabaseManager(path); db.flush()
+    start = time.perf_counter()
+    for i in range(entries): db.add_history_entry(f"https://site{i % 5000}.example/page/{i}", f"Example page {i} about topic {i % 97}")
+    db.flush(); elapsed = time.perf_counter() - start
+    results["history_inserts_per_s"] = entries / elapsed
+    start = time.perf_counter()
+    for i in range(entries // 10): db.add_bookmark(f"https://bookmark{i}.example/", f"Bookmark {i}")
+    db.flush(); results["bookmark_inserts_per_s"] = entries // 10 / (time.perf_counter() - start)
+    start = time.perf_counter(); pages = 0; after = None
+    while pages < 200:
+        rows = db.get_history(after=after)
+        if not rows: break
+        after = (rows[-1][3], rows[-1][0]); pages += 1
+    results["history_pages_per_s"] = pages / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for i in range(500): db.get_history(f"topic {i % 97}")
+    results["history_searches_per_s"] = 500 / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for _ in range(20): db.get_bookmarks()
+    results["bookmark_listings_per_s"] = 20 / (time.perf_counter() - start)
+    start = time.perf_counter(); db.build_url_index(); results["url_index_build_ms"] = (time.perf_counter() - start) * 1000
+    db.close()
+    return results
+
+def run():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--suite", nargs="*", default=["navigation", "tabs", "memory", "database"])
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    parser.add_argument("--rounds", type=int, default=3); parser.add_argument("--tabs", type=int, default=20)
+    parser.add_argument("--max-tabs", type=int, default=50); parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--latency-ms", type=float, default=20, help="artificial server latency per request")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    workdir = tempfile.mkdtemp(prefix="tiwut-bench-"); fixtures = os.path.join(workdir, "fixtures"); os.makedirs(fixtures)
+    write_fixtures(fixtures)
+    server = FixtureServer(fixtures, args.latency_ms / 1000); threading.Thread(target=server.serve_forever, daemon=True).start()
+    cwd = os.getcwd(); os.chdir(workdir)
+    results = {"meta": {"timestamp": time.time(), "python": platform.python_version(), "qt": QT_VERSION_STR, "pyqt": PYQT_VERSION_STR,
+                        "platform": platform.platform(), "args": vars(args)}}
+    try:
+        if "navigation" in args.suite: results["navigation"] = bench_navigation(workdir, server, args.rounds)
+        if "tabs" in args.suite: results["tabs"] = bench_tabs(workdir, server, args.tabs)
+        if "memory" in args.suite: results["memory"] = bench_memory(workdir, server, args.max_tabs)
+        if "database" in args.suite: results["database"] = bench_database(workdir, args.entries)
+    finally:
+        os.chdir(cwd); server.shutdown(); shutil.rmtree(workdir, ignore_errors=True)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f: f.write(output + "\n")
+    else: print(output)
+
+if __name__ == "__main__":
+    run()
@@ -5,15 +5,52 @@ import configparser
 import os
 import sqlite3
 import webbrowser
-from PyQt5.QtCore import QUrl, Qt, QSize
+import re
+import math
+import bisect
+import heapq
+import collections
+import pickle
+import json
+import csv
+import threading
+import queue
+import time
+import hashlib
+import getpass
+import html
+from html.parser import HTMLParser
+from concurrent.futures import Future
+STARTUP_TIME = time.perf_counter()  # taken before the Qt imports so that --profile-startup includes them
+from PyQt5.QtCore import QObject, QEvent, QAbstractItemModel, QModelIndex, QUrl, Qt, QSize, QTimer, QByteArray, QDataStream, QIODevice, pyqtSignal
+from PyQt5.QtNetwork import QLocalServer, QLocalSocket
+
+# config.ini and browser_data.db are opened relative to the working directory, so there is one instance per user and directory.
+INSTANCE_NAME = "tiwut-browser-" + hashlib.sha1(f"{getpass.getuser()}:{os.path.realpath(os.getcwd())}".encode()).hexdigest()[:16]
+
+def url_arguments(argv): return [arg for arg in argv[1:] if not arg.startswith('--')]
+
+def forward_to_running_instance(urls):
+    # Blocking QLocalSocket calls need no event loop, so this works before QApplication exists.
+    socket = QLocalSocket(); socket.connectToServer(INSTANCE_NAME)
+    if not socket.waitForConnected(500): return False
+    socket.write(json.dumps({'urls': urls, 'cwd': os.getcwd()}).encode())
+    socket.waitForBytesWritten(1000); socket.disconnectFromServer()
+    return True
+
+# A second launch hands its URLs to the running browser and exits before the QtWebEngine imports below.
+if __name__ == "__main__" and forward_to_running_instance(url_arguments(sys.argv)): sys.exit(0)
+
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QToolBar, QLineEdit,
                              QPushButton, QDialog, QFormLayout, QCheckBox,
                              QLabel, QDialogButtonBox, QTabWidget, QStatusBar,
                              QProgressBar, QMenu, QVBoxLayout, QComboBox,
                              QListWidget, QListWidgetItem, QAction, QFileDialog,
-                             QHBoxLayout, QWidget)
-from PyQt5.QtWebEngineWidgets import QWebEngineView, QWebEnginePage, QWebEngineProfile, QWebEngineDownloadItem
-from PyQt5.QtGui import QIcon
+                             QHBoxLayout, QWidget, QCompleter, QTableWidget, QTableWidgetItem,
+                             QHeaderView, QSpinBox, QTreeView, QInputDialog, QMessageBox, QStyle)
+from PyQt5.QtWebEngineWidgets import QWebEngineView, QWebEnginePage, QWebEngineProfile, QWebEngineDownloadItem, QWebEngineScript
+from PyQt5.QtWebEngineCore import QWebEngineUrlRequestInterceptor, QWebEngineUrlRequestInfo
+from PyQt5.QtGui import QIcon, QStandardItemModel, QStandardItem
 
 FINAL_DARK_STYLE = """
     /* ... (vorheriger Style) ... */
@@ -29,35 +66,708 @@ FINAL_DARK_STYLE = """
     QListWidget { background-color: #3c3c3c; border: 1px solid #555; color: #e0e0e0; }
 """
 
+# Navigation Timing and Resource Timing summary of the current document, relative to navigation start.
+PAGE_TIMING_SCRIPT = """
+(function () {
+    var nav = performance.getEntriesByType('navigation')[0];
+    var resources = performance.getEntriesByType('resource');
+    var summary = {resource_count: resources.length, resource_transfer_size: 0, cached_resources: 0};
+    resources.forEach(function (r) {
+        summary.resource_transfer_size += r.transferSize || 0;
+        if (r.transferSize === 0 && r.decodedBodySize > 0) summary.cached_resources++;
+    });
+    if (nav) {
+        summary.ttfb_ms = nav.responseStart - nav.startTime;
+        summary.dom_content_loaded_ms = nav.domContentLoadedEventEnd - nav.startTime;
+        summary.load_event_ms = nav.loadEventEnd > 0 ? nav.loadEventEnd - nav.startTime : null;
+        summary.transfer_size = nav.transferSize;
+        summary.from_cache = nav.transferSize === 0 && nav.decodedBodySize > 0 ? 1 : 0;
+    }
+    return JSON.stringify(summary);
+})()
+"""
+
+def percentile(values, fraction):
+    # Nearest-rank percentile of an already sorted list.
+    if not values: return None
+    return values[min(len(values) - 1, max(0, math.ceil(fraction * len(values)) - 1))]
+
+def format_size(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024: return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+def directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try: total += os.path.getsize(os.path.join(root, name))
+            except OSError: pass
+    return total
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}" if seconds >= 3600 else f"{seconds // 60}:{seconds % 60:02d}"
+
+class StartupProfiler:
+    # Prints a phase-by-phase startup breakdown to stderr when run with --profile-startup.
+    def __init__(self):
+        self.enabled = False; self.last = STARTUP_TIME; self.seen = set()
+    def mark(self, phase, deferred=False):
+        if not self.enabled: return
+        now = time.perf_counter()
+        print(f"[startup] {(now - STARTUP_TIME) * 1000:8.1f} ms  {'' if deferred else f'+{(now - self.last) * 1000:.1f} ms':>11}  {phase}{' (deferred)' if deferred else ''}", file=sys.stderr)
+        if not deferred: self.last = now
+    def mark_once(self, phase):
+        if phase not in self.seen: self.seen.add(phase); self.mark(phase)
+
+startup_profiler = StartupProfiler()
+
 class DatabaseManager:
+    FLUSH_INTERVAL = 0.5; FLUSH_BATCH_SIZE = 256; IMPORT_BATCH_SIZE = 5000
+    SCHEMA_VERSION = 3; FRECENCY_HALF_LIFE = 30 * 24 * 3600; METRICS_RETENTION = 30 * 24 * 3600
+    PAGE_LOAD_COLUMNS = ("timestamp", "url", "domain", "ok", "load_ms", "ttfb_ms", "dom_content_loaded_ms", "load_event_ms",
+                         "transfer_size", "from_cache", "resource_count", "resource_transfer_size", "cached_resources", "cache_mode", "cookie_policy")
+    _STOP = object()
     def __init__(self, db_name="browser_data.db"):
-        self.conn = sqlite3.connect(db_name)
-        self.cursor = self.conn.cursor()
+        self.db_name = db_name; self.queue = queue.Queue(); self.url_index = UrlIndex(); self.index_log = None; self.has_fts = False
+        self.writer = threading.Thread(target=self._writer_loop, name="DatabaseWriter", daemon=True); self.writer.start()
         self.create_tables()
+    def _writer_loop(self):
+        # The writer thread owns the only connection; writes are grouped into transactions
+        # that are committed after FLUSH_INTERVAL seconds or FLUSH_BATCH_SIZE statements.
+        conn = sqlite3.connect(self.db_name); cursor = conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL"); cursor.execute("PRAGMA synchronous=NORMAL")
+        pending = 0; deadline = None
+        while True:
+            try: job = self.queue.get(timeout=None if deadline is None else max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                conn.commit(); pending = 0; deadline = None; continue
+            if job is self._STOP: break
+            func, write, future = job
+            if func is None:
+                conn.commit(); pending = 0; deadline = None; future.set_result(None); continue
+            try: result = func(cursor)
+            except Exception as e:
+                if future: future.set_exception(e)
+                else: print(f"DatabaseManager: {e}", file=sys.stderr)
+                continue
+            if future: future.set_result(result)
+            if write:
+                pending += 1
+                if deadline is None: deadline = time.monotonic() + self.FLUSH_INTERVAL
+                if pending >= self.FLUSH_BATCH_SIZE: conn.commit(); pending = 0; deadline = None
+        conn.commit(); conn.close()
+    def _submit(self, func, write=True, wait=False):
+        if not self.writer.is_alive(): raise RuntimeError("DatabaseManager is closed")
+        future = Future() if wait else None
+        self.queue.put((func, write, future))
+        return future.result() if wait else None
+    def _query(self, sql, params=()): return self._submit(lambda c: c.execute(sql, params).fetchall(), write=False, wait=True)
+    def _execute(self, sql, params=()): self._submit(lambda c: c.execute(sql, params))
+    def flush(self):
+        if self.writer.is_alive(): self._submit(None, write=False, wait=True)
+    def close(self):
+        if self.writer.is_alive(): self.queue.put(self._STOP); self.writer.join()
     def create_tables(self):
-        self.cursor.execute("CREATE TABLE IF NOT EXISTS history (id INTEGER PRIMARY KEY, url TEXT NOT NULL, title TEXT NOT NULL, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)")
-        self.cursor.execute("CREATE TABLE IF NOT EXISTS bookmarks (id INTEGER PRIMARY KEY, url TEXT NOT NULL, title TEXT NOT NULL, UNIQUE(url))")
-        self.conn.commit()
+        def create(c):
+            version = c.execute("PRAGMA user_version").fetchone()[0]
+            if version < 1: self._migrate_history(c)
+            c.execute("CREATE TABLE IF NOT EXISTS bookmarks (id INTEGER PRIMARY KEY, url TEXT NOT NULL, title TEXT NOT NULL, folder_id INTEGER NOT NULL DEFAULT 0, added REAL NOT NULL DEFAULT 0, UNIQUE(url))")
+            if version < 3:
+                columns = {row[1] for row in c.execute("PRAGMA table_info(bookmarks)")}
+                if "folder_id" not in columns: c.execute("ALTER TABLE bookmarks ADD COLUMN folder_id INTEGER NOT NULL DEFAULT 0")
+                if "added" not in columns: c.execute("ALTER TABLE bookmarks ADD COLUMN added REAL NOT NULL DEFAULT 0")
+            # Folder 0 is the root; a bookmark is in exactly one folder and can have any number of tags.
+            c.execute("CREATE INDEX IF NOT EXISTS idx_bookmarks_folder ON bookmarks (folder_id, title, id)")
+            c.execute("CREATE TABLE IF NOT EXISTS bookmark_folders (id INTEGER PRIMARY KEY, parent_id INTEGER NOT NULL, name TEXT NOT NULL, UNIQUE(parent_id, name))")
+            c.execute("CREATE TABLE IF NOT EXISTS bookmark_tags (bookmark_id INTEGER NOT NULL, tag TEXT NOT NULL, PRIMARY KEY (bookmark_id, tag)) WITHOUT ROWID")
+            c.execute("CREATE INDEX IF NOT EXISTS idx_bookmark_tags_tag ON bookmark_tags (tag)")
+            c.execute("CREATE TRIGGER IF NOT EXISTS bookmarks_ad AFTER DELETE ON bookmarks BEGIN DELETE FROM bookmark_tags WHERE bookmark_id = old.id; END")
+            c.execute("CREATE INDEX IF NOT EXISTS idx_history_last_visit ON history (last_visit, id)")
+            c.execute("CREATE INDEX IF NOT EXISTS idx_history_frecency ON history (frecency, id)")
+            c.execute(f"CREATE TABLE IF NOT EXISTS page_load_metrics (id INTEGER PRIMARY KEY, {', '.join(self.PAGE_LOAD_COLUMNS)})")
+            c.execute("CREATE INDEX IF NOT EXISTS idx_page_load_metrics_timestamp ON page_load_metrics (timestamp)")
+            c.execute("CREATE TABLE IF NOT EXISTS downloads (id INTEGER PRIMARY KEY, url TEXT NOT NULL, path TEXT NOT NULL, size INTEGER NOT NULL, started REAL NOT NULL, duration REAL NOT NULL, average_speed REAL, state TEXT NOT NULL)")
+            c.execute("CREATE INDEX IF NOT EXISTS idx_downloads_started ON downloads (started)")
+            c.execute("CREATE TABLE IF NOT EXISTS session_tabs (id INTEGER PRIMARY KEY, position INTEGER NOT NULL, url TEXT NOT NULL, title TEXT NOT NULL, history BLOB, current INTEGER NOT NULL DEFAULT 0, window_id INTEGER NOT NULL DEFAULT 0)")
+            if version < 2 and "window_id" not in {row[1] for row in c.execute("PRAGMA table_info(session_tabs)")}:
+                c.execute("ALTER TABLE session_tabs ADD COLUMN window_id INTEGER NOT NULL DEFAULT 0")
+            self.has_fts = self._create_history_fts(c)
+            c.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+            c.connection.commit()
+        self._submit(create)
+    def _migrate_history(self, c):
+        # Version 0 stored one row per visit; fold them into one row per URL with visit count and frecency.
+        legacy = c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'history'").fetchone()
+        if legacy: c.execute("ALTER TABLE history RENAME TO history_legacy")
+        c.execute("CREATE TABLE history (id INTEGER PRIMARY KEY, url TEXT NOT NULL UNIQUE, title TEXT NOT NULL, visit_count INTEGER NOT NULL DEFAULT 1, last_visit REAL NOT NULL, frecency REAL NOT NULL)")
+        if not legacy: return
+        places = {}
+        for url, title, visited in c.execute("SELECT url, title, COALESCE(CAST(strftime('%s', timestamp) AS REAL), 0) FROM history_legacy ORDER BY timestamp, id").fetchall():
+            score = visited / self.FRECENCY_HALF_LIFE
+            if url in places:
+                count, _, _, frecency = places[url]; places[url] = (count + 1, title, visited, self._log2_add(frecency, score))
+            else: places[url] = (1, title, visited, score)
+        c.executemany("INSERT INTO history (url, title, visit_count, last_visit, frecency) VALUES (?, ?, ?, ?, ?)",
+                      [(url, title, count, visited, frecency) for url, (count, title, visited, frecency) in places.items()])
+        c.execute("DROP TABLE history_legacy")
+    def _create_history_fts(self, c):
+        exists = c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'history_fts'").fetchone()
+        try: c.execute("CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(title, url, content='history', content_rowid='id')")
+        except sqlite3.OperationalError: return False
+        c.execute("CREATE TRIGGER IF NOT EXISTS history_ai AFTER INSERT ON history BEGIN INSERT INTO history_fts (rowid, title, url) VALUES (new.id, new.title, new.url); END")
+        c.execute("CREATE TRIGGER IF NOT EXISTS history_ad AFTER DELETE ON history BEGIN INSERT INTO history_fts (history_fts, rowid, title, url) VALUES ('delete', old.id, old.title, old.url); END")
+        # Every revisit sets title, so the trigger only reindexes rows whose text changed. It is recreated
+        # on each start so that databases created before the WHEN clause pick it up.
+        c.execute("DROP TRIGGER IF EXISTS history_au")
+        c.execute("CREATE TRIGGER history_au AFTER UPDATE OF title, url ON history WHEN old.title IS NOT new.title OR old.url IS NOT new.url BEGIN "
+                  "INSERT INTO history_fts (history_fts, rowid, title, url) VALUES ('delete', old.id, old.title, old.url); "
+                  "INSERT INTO history_fts (rowid, title, url) VALUES (new.id, new.title, new.url); END")
+        if not exists: c.execute("INSERT INTO history_fts (history_fts) VALUES ('rebuild')")
+        return True
+    @staticmethod
+    def _log2_add(a, b):
+        # log2(2**a + 2**b) without overflowing: frecency is the log of a sum of exponentially decaying visits.
+        high, low = max(a, b), min(a, b)
+        return high + math.log2(1 + 2 ** (low - high))
     def add_history_entry(self, url, title):
         if url.startswith("https://www.google.com/search?q="): return
-        self.cursor.execute("INSERT INTO history (url, title) VALUES (?, ?)", (url, title))
-        self.conn.commit()
-    def get_history(self):
-        self.cursor.execute("SELECT title, url FROM history ORDER BY timestamp DESC LIMIT 100")
-        return self.cursor.fetchall()
+        self._update_index(lambda index: index.visit(url, title))
+        def visit(c):
+            now = time.time(); score = now / self.FRECENCY_HALF_LIFE
+            row = c.execute("SELECT frecency FROM history WHERE url = ?", (url,)).fetchone()
+            if row: score = self._log2_add(row[0], score)
+            c.execute("INSERT INTO history (url, title, visit_count, last_visit, frecency) VALUES (?, ?, 1, ?, ?) "
+                      "ON CONFLICT(url) DO UPDATE SET title = excluded.title, visit_count = visit_count + 1, last_visit = excluded.last_visit, frecency = excluded.frecency",
+                      (url, title, now, score))
+        self._submit(visit)
+    def get_history(self, search="", after=None, limit=100):
+        # Keyset paging: pass the (sort key, id) of the last row returned to fetch the next page.
+        # Plain listings are ordered by last visit, searches by frecency.
+        after = after or (float('inf'), 0)
+        tokens = re.findall(r"\w+", search)
+        def query(c):
+            if not tokens:
+                return c.execute("SELECT id, title, url, last_visit FROM history WHERE (last_visit, id) < (?, ?) ORDER BY last_visit DESC, id DESC LIMIT ?", (*after, limit)).fetchall()
+            if self.has_fts:
+                match = " ".join(f'"{token}"*' for token in tokens)
+                return c.execute("SELECT h.id, h.title, h.url, h.frecency FROM history_fts JOIN history h ON h.id = history_fts.rowid "
+                                 "WHERE history_fts MATCH ? AND (h.frecency, h.id) < (?, ?) ORDER BY h.frecency DESC, h.id DESC LIMIT ?", (match, *after, limit)).fetchall()
+            where = " AND ".join("(title LIKE ? OR url LIKE ?)" for _ in tokens)
+            patterns = [f"%{token}%" for token in tokens for _ in (0, 1)]
+            return c.execute(f"SELECT id, title, url, frecency FROM history WHERE {where} AND (frecency, id) < (?, ?) ORDER BY frecency DESC, id DESC LIMIT ?", (*patterns, *after, limit)).fetchall()
+        return self._submit(query, write=False, wait=True)
     def clear_history(self):
-        self.cursor.execute("DELETE FROM history"); self.conn.commit()
-    def add_bookmark(self, url, title):
-        self.cursor.execute("INSERT OR IGNORE INTO bookmarks (url, title) VALUES (?, ?)", (url, title))
-        self.conn.commit()
+        self._update_index(lambda index: index.clear_history())
+        self._execute("DELETE FROM history")
+    def build_url_index(self, max_entries=None):
+        # Safe to call from any thread; the index is private until install_url_index swaps it in.
+        index = UrlIndex(max_entries or self.url_index.max_entries)
+        history = self._query("SELECT url, title, frecency FROM history ORDER BY frecency DESC LIMIT ?", (index.max_entries,))
+        index.load(history, [(url, title) for title, url in self.get_bookmarks()])
+        return index
+    def begin_url_index_rebuild(self): self.index_log = []
+    def cancel_url_index_rebuild(self): self.index_log = None
+    def install_url_index(self, index):
+        for change in self.index_log or (): change(index)
+        self.url_index = index; self.index_log = None
+    def _update_index(self, change):
+        change(self.url_index)
+        if self.index_log is not None: self.index_log.append(change)
+    def add_page_load(self, sample):
+        self._execute(f"INSERT INTO page_load_metrics ({', '.join(self.PAGE_LOAD_COLUMNS)}) VALUES ({', '.join('?' * len(self.PAGE_LOAD_COLUMNS))})",
+                      tuple(sample.get(column) for column in self.PAGE_LOAD_COLUMNS))
+    def get_top_sites(self, limit):
+        return [row[0] for row in self._query("SELECT url FROM history WHERE url LIKE 'http%' ORDER BY frecency DESC LIMIT ?", (limit,))]
+    def get_page_loads(self):
+        return self._query(f"SELECT {', '.join(self.PAGE_LOAD_COLUMNS)} FROM page_load_metrics ORDER BY timestamp")
+    def prune_page_loads(self):
+        self._execute("DELETE FROM page_load_metrics WHERE timestamp < ?", (time.time() - self.METRICS_RETENTION,))
+    def add_download(self, url, path, size, started, duration, state):
+        self._execute("INSERT INTO downloads (url, path, size, started, duration, average_speed, state) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                      (url, path, size, started, duration, size / duration if duration > 0 else None, state))
+    def get_downloads(self, limit=500):
+        return self._query("SELECT path, size, started, duration, average_speed, state FROM downloads ORDER BY started DESC LIMIT ?", (limit,))
+    def clear_downloads(self): self._execute("DELETE FROM downloads")
+    def save_session(self, tabs, positions=None, closed=(), current=None, window_id=0):
+        # tabs are (id, url, title, history) rows to insert or replace, positions (position, id) pairs for every tab of the window.
+        # Everything is written in one job, so a crash leaves either the previous or the new session on disk.
+        def save(c):
+            if closed: c.executemany("DELETE FROM session_tabs WHERE id = ?", [(tab_id,) for tab_id in closed])
+            c.executemany("INSERT INTO session_tabs (id, position, url, title, history) VALUES (?, -1, ?, ?, ?) "
+                          "ON CONFLICT(id) DO UPDATE SET url = excluded.url, title = excluded.title, history = excluded.history", tabs)
+            if positions is not None:
+                c.executemany("UPDATE session_tabs SET position = ?, current = ?, window_id = ? WHERE id = ?",
+                              [(position, tab_id == current, window_id, tab_id) for position, tab_id in positions])
+        self._submit(save)
+    def get_session(self):
+        return self._query("SELECT id, url, title, history, current, window_id FROM session_tabs ORDER BY window_id, position")
+    def clear_session(self): self._execute("DELETE FROM session_tabs")
+    def add_bookmark(self, url, title, folder_id=0):
+        self._update_index(lambda index: index.set_bookmarked(url, title, True))
+        self._execute("INSERT OR IGNORE INTO bookmarks (url, title, folder_id, added) VALUES (?, ?, ?, ?)", (url, title, folder_id, time.time()))
     def get_bookmarks(self):
-        self.cursor.execute("SELECT title, url FROM bookmarks ORDER BY title ASC")
-        return self.cursor.fetchall()
+        return self._query("SELECT title, url FROM bookmarks ORDER BY title ASC")
+    def get_bookmark_folders(self, parent_id=0):
+        return self._query("SELECT id, name FROM bookmark_folders WHERE parent_id = ? ORDER BY name", (parent_id,))
+    def get_bookmark_page(self, folder_id=0, after=None, limit=200):
+        # Keyset paging like get_history: pass the (title, id) of the last row returned to fetch the next page.
+        after = after or ("", 0)
+        return self._query("SELECT b.id, b.title, b.url, (SELECT group_concat(tag, ',') FROM bookmark_tags WHERE bookmark_id = b.id), b.added FROM bookmarks b "
+                           "WHERE b.folder_id = ? AND (b.title, b.id) > (?, ?) ORDER BY b.title, b.id LIMIT ?", (folder_id, *after, limit))
+    def iter_bookmarks(self, folder_id=0, page_size=1000):
+        after = None
+        while True:
+            page = self.get_bookmark_page(folder_id, after, page_size)
+            yield from page
+            if len(page) < page_size: return
+            after = (page[-1][1], page[-1][0])
+    def add_bookmark_folder(self, name, parent_id=0):
+        def add(c):
+            c.execute("INSERT OR IGNORE INTO bookmark_folders (parent_id, name) VALUES (?, ?)", (parent_id, name))
+            return c.execute("SELECT id FROM bookmark_folders WHERE parent_id = ? AND name = ?", (parent_id, name)).fetchone()[0]
+        return self._submit(add, wait=True)
+    def set_bookmark_tags(self, bookmark_id, tags):
+        def save(c):
+            c.execute("DELETE FROM bookmark_tags WHERE bookmark_id = ?", (bookmark_id,))
+            c.executemany("INSERT OR IGNORE INTO bookmark_tags (bookmark_id, tag) VALUES (?, ?)", [(bookmark_id, tag) for tag in tags])
+        self._submit(save)
+    def import_bookmarks(self, entries):
+        # entries are (url, title, folder path, tags, added) tuples. They are written IMPORT_BATCH_SIZE at a time, one
+        # executemany transaction per batch, and each batch is waited for so that a large file is never held in memory.
+        # Bookmarks whose URL already exists are skipped. Returns the number of bookmarks added.
+        folders = {(): 0}
+        def folder_id(c, path):
+            if path not in folders:
+                parent = folder_id(c, path[:-1])
+                c.execute("INSERT OR IGNORE INTO bookmark_folders (parent_id, name) VALUES (?, ?)", (parent, path[-1]))
+                folders[path] = c.execute("SELECT id FROM bookmark_folders WHERE parent_id = ? AND name = ?", (parent, path[-1])).fetchone()[0]
+            return folders[path]
+        def write(batch):
+            def insert(c):
+                rows = [(url, title, folder_id(c, folder), added) for url, title, folder, _, added in batch]
+                c.executemany("INSERT OR IGNORE INTO bookmarks (url, title, folder_id, added) VALUES (?, ?, ?, ?)", rows)
+                inserted = c.rowcount
+                c.executemany("INSERT OR IGNORE INTO bookmark_tags (bookmark_id, tag) SELECT id, ? FROM bookmarks WHERE url = ?",
+                              [(tag, url) for url, _, _, tags, _ in batch for tag in tags])
+                c.connection.commit()
+                return inserted
+            return self._submit(insert, wait=True)
+        total = 0; batch = []
+        for entry in entries:
+            batch.append(entry)
+            if len(batch) >= self.IMPORT_BATCH_SIZE: total += write(batch); batch = []
+        if batch: total += write(batch)
+        return total
     def clear_bookmarks(self):
-        self.cursor.execute("DELETE FROM bookmarks"); self.conn.commit()
+        self._update_index(lambda index: index.clear_bookmarks())
+        self._execute("DELETE FROM bookmarks"); self._execute("DELETE FROM bookmark_folders")
     def delete_bookmark(self, url):
-        self.cursor.execute("DELETE FROM bookmarks WHERE url = ?", (url,))
-        self.conn.commit()
+        self._update_index(lambda index: index.set_bookmarked(url, "", False))
+        self._execute("DELETE FROM bookmarks WHERE url = ?", (url,))
+    def delete_bookmark_folder(self, folder_id):
+        # Deletes the folder with all its subfolders and bookmarks.
+        subtree = "WITH RECURSIVE subtree(id) AS (SELECT ? UNION ALL SELECT f.id FROM bookmark_folders f JOIN subtree s ON f.parent_id = s.id) "
+        for (url,) in self._query(subtree + "SELECT url FROM bookmarks WHERE folder_id IN subtree", (folder_id,)):
+            self._update_index(lambda index, url=url: index.set_bookmarked(url, "", False))
+        def delete(c):
+            c.execute(subtree + "DELETE FROM bookmarks WHERE folder_id IN subtree", (folder_id,))
+            c.execute(subtree + "DELETE FROM bookmark_folders WHERE id IN subtree", (folder_id,))
+        self._submit(delete)
+
+BYTE_BITS = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+
+class UrlIndexEntry:
+    __slots__ = ("title", "frecency", "bookmarked", "visited", "tokens", "slot")
+    def __init__(self, title, frecency, bookmarked, visited, tokens, slot):
+        self.title = title; self.frecency = frecency; self.bookmarked = bookmarked; self.visited = visited
+        self.tokens = tokens; self.slot = slot
+
+class UrlIndex:
+    # In-memory prefix/token index over history and bookmarks for omnibox suggestions.
+    # Each query word prefix-matches the tokens of an entry. Prefixes shared by more than
+    # HOT_THRESHOLD entries are "hot": they keep a best-first list of urls plus a bitmask over
+    # entry slots, so typing never unions large postings and multi-word queries intersect in C.
+    # The index costs roughly 2.4 KB per entry, so MAX_ENTRIES (omnibox_index_entries in config.ini) bounds its memory.
+    MAX_ENTRIES = 10000; HOT_THRESHOLD = 1024; HOT_SLOTS = 256; BOOKMARK_BONUS = 3.0
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or self.MAX_ENTRIES
+        self.clear()
+    def clear(self):
+        self.entries = {}     # url -> UrlIndexEntry
+        self.ranks = {}       # url -> frecency plus bookmark bonus
+        self.haystacks = {}   # url -> " token token ..." for substring checks of further query words
+        self.postings = {}    # token -> set of urls
+        self.tokens = []      # sorted distinct tokens
+        self.slot_urls = []   # slot -> url, None for freed slots
+        self.free_slots = []
+        self.hot = {}         # prefix -> best-first list of urls
+        self.hot_masks = {}   # prefix -> bitmask of the slots of every matching url
+        self.hot_sizes = {}   # prefix -> number of matching urls when the prefix became hot
+        self.heap = None      # min-heap of (rank, url) for eviction, built on first use; pairs whose rank changed are stale
+    def __len__(self): return len(self.entries)
+    SCHEME_RE = re.compile(r"^[a-z][a-z0-9+.-]*://(www\.)?"); WORD_RE = re.compile(r"\w+")
+    @classmethod
+    def tokenize(cls, url, title):
+        stripped = cls.SCHEME_RE.sub("", url.lower(), 1)[:200]
+        return frozenset(cls.WORD_RE.findall(f"{stripped} {title.lower()}"))
+    @staticmethod
+    def now():
+        return time.time() / DatabaseManager.FRECENCY_HALF_LIFE
+    def load(self, history, bookmarks):
+        self.clear()
+        for url, title, frecency in history:
+            if url not in self.entries: self._insert(url, title, frecency, False, True)
+        now = self.now()
+        for url, title in bookmarks:
+            if url in self.entries: self.entries[url].bookmarked = True; self.ranks[url] += self.BOOKMARK_BONUS
+            else: self._insert(url, title, now, True, False)
+        self.tokens.sort()
+        if len(self.entries) > self.max_entries: self._prune()
+        else: self._warm()
+    def visit(self, url, title):
+        entry = self.entries.get(url)
+        if entry: self._update(url, title, DatabaseManager._log2_add(entry.frecency, self.now()) if entry.visited else self.now(), entry.bookmarked, True)
+        else: self._add(url, title, self.now(), False, True)
+    def set_bookmarked(self, url, title, bookmarked):
+        entry = self.entries.get(url)
+        if not entry:
+            if bookmarked: self._add(url, title, self.now(), True, False)
+        elif not bookmarked and not entry.visited: self.remove(url)
+        elif entry.bookmarked != bookmarked: self._update(url, entry.title, entry.frecency, bookmarked, entry.visited)
+    def clear_history(self):
+        self.retain(lambda entry: entry.bookmarked)
+        for entry in self.entries.values(): entry.visited = False
+    def clear_bookmarks(self):
+        self.retain(lambda entry: entry.visited)
+        for url, entry in list(self.entries.items()):
+            if entry.bookmarked: self._update(url, entry.title, entry.frecency, False, True)
+    def retain(self, predicate):
+        for url in [url for url, entry in self.entries.items() if not predicate(entry)]: self.remove(url)
+    def remove(self, url):
+        entry = self.entries.pop(url, None)
+        if not entry: return
+        del self.ranks[url], self.haystacks[url]; self.slot_urls[entry.slot] = None; self.free_slots.append(entry.slot)
+        for token in entry.tokens:
+            urls = self.postings[token]; urls.discard(url)
+            if not urls:
+                del self.postings[token]; del self.tokens[bisect.bisect_left(self.tokens, token)]
+        bit = 1 << entry.slot
+        for prefix in self._prefixes(entry.tokens):
+            if prefix not in self.hot: continue
+            self.hot_masks[prefix] &= ~bit
+            # A truncated list cannot refill itself; drop it and let the next query rebuild it.
+            if url in self.hot[prefix]: del self.hot[prefix], self.hot_masks[prefix], self.hot_sizes[prefix]
+    def _insert(self, url, title, frecency, bookmarked, visited, sorted_insert=False):
+        tokens = self.tokenize(url, title)
+        if self.free_slots: slot = self.free_slots.pop(); self.slot_urls[slot] = url
+        else: slot = len(self.slot_urls); self.slot_urls.append(url)
+        self.entries[url] = UrlIndexEntry(title, frecency, bookmarked, visited, tokens, slot)
+        self.ranks[url] = frecency + self.BOOKMARK_BONUS if bookmarked else frecency
+        if self.heap is not None: heapq.heappush(self.heap, (self.ranks[url], url))
+        self.haystacks[url] = " " + " ".join(tokens)
+        for token in tokens:
+            urls = self.postings.get(token)
+            if urls is None:
+                urls = self.postings[token] = set()
+                if sorted_insert: bisect.insort(self.tokens, token)
+                else: self.tokens.append(token)
+            urls.add(url)
+    def _add(self, url, title, frecency, bookmarked, visited):
+        self._insert(url, title, frecency, bookmarked, visited, sorted_insert=True)
+        bit = 1 << self.entries[url].slot
+        for prefix in self._prefixes(self.entries[url].tokens):
+            if prefix in self.hot_masks: self.hot_masks[prefix] |= bit
+        self._promote(url)
+        if len(self.entries) > self.max_entries: self._evict()
+    def _update(self, url, title, frecency, bookmarked, visited):
+        entry = self.entries[url]
+        if title != entry.title and self.tokenize(url, title) != entry.tokens:
+            self.remove(url); self._add(url, title, frecency, bookmarked, visited); return
+        old_rank = self.ranks[url]
+        entry.title = title; entry.frecency = frecency; entry.bookmarked = bookmarked; entry.visited = visited
+        self.ranks[url] = frecency + self.BOOKMARK_BONUS if bookmarked else frecency
+        if self.heap is not None: heapq.heappush(self.heap, (self.ranks[url], url))
+        if self.ranks[url] >= old_rank: self._promote(url)
+        else:
+            for prefix in self._prefixes(entry.tokens):
+                if prefix in self.hot and url in self.hot[prefix]: del self.hot[prefix], self.hot_masks[prefix], self.hot_sizes[prefix]
+    def _promote(self, url):
+        rank = self.ranks[url]
+        for prefix in self._prefixes(self.entries[url].tokens):
+            slots = self.hot.get(prefix)
+            if slots is None: continue
+            if url in slots: slots.remove(url)
+            elif len(slots) >= self.HOT_SLOTS and rank <= self.ranks[slots[-1]]: continue
+            lo, hi = 0, len(slots)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self.ranks[slots[mid]] >= rank: lo = mid + 1
+                else: hi = mid
+            slots.insert(lo, url); del slots[self.HOT_SLOTS:]
+    def _prefixes(self, tokens):
+        prefixes = set()
+        for token in tokens: prefixes.update(token[:i] for i in range(1, len(token) + 1))
+        return prefixes
+    def _prune(self):
+        # Keep the best-ranked max_entries entries and renumber slots so the bitmasks stay compact.
+        keep = heapq.nlargest(self.max_entries, self.entries.items(), key=lambda item: self.ranks[item[0]])
+        self.clear()
+        for url, entry in keep: self._insert(url, entry.title, entry.frecency, entry.bookmarked, entry.visited)
+        self.tokens.sort(); self._warm()
+    def _evict(self):
+        # Called on the GUI thread for every new URL past the cap, so entries are dropped one at a time
+        # instead of rebuilding the index; the heap is rebuilt once stale pairs outnumber live ones.
+        if self.heap is None or len(self.heap) > 2 * len(self.entries):
+            self.heap = [(rank, url) for url, rank in self.ranks.items()]; heapq.heapify(self.heap)
+        while len(self.entries) > self.max_entries and self.heap:
+            rank, url = heapq.heappop(self.heap)
+            if self.ranks.get(url) == rank: self.remove(url)
+    def _warm(self):
+        # Materialize every hot prefix bottom-up: each prefix merges the masks and best-first lists of its
+        # hot children, so every posting is visited once instead of once per prefix that covers it.
+        counts = collections.Counter()
+        for token, urls in self.postings.items():
+            size = len(urls)
+            for i in range(1, len(token) + 1): counts[token[:i]] += size
+        pending = {prefix for prefix, count in counts.items() if count > self.HOT_THRESHOLD}
+        direct = collections.defaultdict(set)
+        for token, urls in self.postings.items():
+            for i in range(len(token), 0, -1):
+                if token[:i] in pending: direct[token[:i]].update(urls); break
+        masks = {}; lists = {}; children = collections.defaultdict(list)
+        for prefix in sorted(pending, key=len, reverse=True):
+            urls = direct.pop(prefix, set())
+            bits = bytearray(len(self.slot_urls) // 8 + 1); entries = self.entries
+            for url in urls:
+                slot = entries[url].slot; bits[slot >> 3] |= 1 << (slot & 7)
+            mask = int.from_bytes(bits, "little")
+            for child in children.pop(prefix, ()):
+                mask |= masks.pop(child); urls.update(lists.pop(child))
+            masks[prefix] = mask; lists[prefix] = heapq.nlargest(self.HOT_SLOTS, urls, key=self.ranks.__getitem__)
+            size = bin(mask).count("1")
+            if size > self.HOT_THRESHOLD: self.hot[prefix] = lists[prefix]; self.hot_masks[prefix] = mask; self.hot_sizes[prefix] = size
+            if len(prefix) > 1: children[prefix[:-1]].append(prefix)
+    def _token_range(self, prefix):
+        lo = bisect.bisect_left(self.tokens, prefix)
+        return lo, bisect.bisect_left(self.tokens, prefix[:-1] + chr(ord(prefix[-1]) + 1), lo)
+    def _full(self, prefix):
+        candidates = set(); lo, hi = self._token_range(prefix)
+        for token in self.tokens[lo:hi]: candidates.update(self.postings[token])
+        return candidates
+    def _candidates(self, prefix):
+        slots = self.hot.get(prefix)
+        if slots is not None: return slots, True
+        candidates = self._full(prefix)
+        if len(candidates) <= self.HOT_THRESHOLD: return candidates, False
+        bits = bytearray(len(self.slot_urls) // 8 + 1)
+        for url in candidates:
+            slot = self.entries[url].slot; bits[slot >> 3] |= 1 << (slot & 7)
+        self.hot_masks[prefix] = int.from_bytes(bits, "little"); self.hot_sizes[prefix] = len(candidates)
+        slots = self.hot[prefix] = heapq.nlargest(self.HOT_SLOTS, candidates, key=self.ranks.__getitem__)
+        return slots, True
+    def _mask_urls(self, mask):
+        urls = []; bits = mask.to_bytes(len(self.slot_urls) // 8 + 1, "little")
+        for match in re.finditer(rb"[^\x00]", bits):
+            base = match.start() << 3
+            urls.extend([self.slot_urls[base + bit] for bit in BYTE_BITS[bits[match.start()]]])
+        return urls
+    def _filter(self, candidates, words):
+        for word in words:
+            needle = " " + word; haystacks = self.haystacks
+            candidates = [url for url in candidates if needle in haystacks[url]]
+        return candidates
+    def search(self, text, limit=8):
+        words = sorted(set(self.WORD_RE.findall(text.lower())), key=len, reverse=True)
+        if not words: return []
+        lookups = [(word, *self._candidates(word)) for word in words]
+        lookups.sort(key=lambda lookup: (lookup[2], self.hot_sizes.get(lookup[0], len(lookup[1]))))
+        word, candidates, hot = lookups[0]
+        others = [lookup[0] for lookup in lookups[1:]]
+        if hot:
+            # Every word is hot: the best-first list of the most selective one is usually enough, otherwise intersect the masks.
+            matches = self._filter(candidates, others)
+            if len(matches) >= limit or len(candidates) < self.HOT_SLOTS: return [(url, self.entries[url].title) for url in matches[:limit]]
+            mask = self.hot_masks[word]
+            for other in others: mask &= self.hot_masks[other]
+            candidates = self._mask_urls(mask)
+        else: candidates = self._filter(candidates, others)
+        results = heapq.nlargest(limit, candidates, key=self.ranks.__getitem__)
+        return [(url, self.entries[url].title) for url in results]
+
+class FilterEngine:
+    # EasyList/Adblock Plus network filters compiled into hash indexes. Rules anchored to a host
+    # (||example.com^) are keyed by that host, the others by their rarest complete token, so a
+    # request only tests the handful of rules that share its host suffixes or URL tokens.
+    # Element hiding, regex and unsupported-option rules are skipped.
+    CACHE_VERSION = 2
+    TYPES = {"script": 1, "image": 2, "stylesheet": 4, "object": 8, "xmlhttprequest": 16, "subdocument": 32,
+             "ping": 64, "media": 128, "font": 256, "websocket": 512, "other": 1024, "document": 2048}
+    TYPE_ALIASES = {"xhr": "xmlhttprequest", "css": "stylesheet", "frame": "subdocument", "object-subrequest": "object"}
+    ALL_TYPES = 2047  # every type except document, which only exception rules may name
+    IGNORED_OPTIONS = {"important", "collapse", "~collapse"}
+    # Multi-label public suffixes used when filters/public_suffix_list.dat is missing, so that sites under
+    # co.uk or github.io are not all treated as the same first party. Single-label TLDs need no entry.
+    DEFAULT_SUFFIXES = frozenset(
+        f"{second}.{tld}" for tld in ("uk", "au", "nz", "za", "jp", "kr", "br", "cn", "in", "il", "tr", "mx", "ar", "tw", "hk", "sg", "my", "id", "th")
+        for second in ("co", "com", "net", "org", "gov", "edu", "ac", "ne", "or", "go")) | frozenset((
+        "github.io", "gitlab.io", "herokuapp.com", "netlify.app", "vercel.app", "pages.dev", "workers.dev", "web.app",
+        "firebaseapp.com", "appspot.com", "blogspot.com", "wordpress.com", "tumblr.com", "azurewebsites.net",
+        "cloudfront.net", "s3.amazonaws.com", "fastly.net", "glitch.me", "neocities.org", "readthedocs.io"))
+    TOKEN_RE = re.compile(r"[a-z0-9%]+"); HOST_RULE_RE = re.compile(r"^\|\|([a-z0-9.-]+)(\^|/|$)")
+    def __init__(self):
+        self.rules = []                                # rule id -> (regex source or None, match case, type mask, third party, include domains, exclude domains)
+        self.block = ({}, {}, [])                      # (host -> rule ids, token -> rule ids, untokenized rule ids)
+        self.allow = ({}, {}, [])
+        self.regexes = {}                              # rule id -> compiled pattern, built on first use
+        self.suffixes = self.DEFAULT_SUFFIXES          # public suffix rules, replaced by public_suffix_list.dat if present
+        self.sites = {}                                # host -> registrable domain
+        self.pending = []
+    @classmethod
+    def load(cls, paths, cache_path, suffix_path=None, cached_only=False):
+        # The compiled indexes are pickled next to the lists and reused while every list keeps its size and mtime.
+        # With cached_only a stale or missing cache returns None instead of compiling the lists.
+        sources = paths + [suffix_path] if suffix_path else paths
+        signature = [cls.CACHE_VERSION] + [(path, os.path.getsize(path), os.path.getmtime(path)) for path in sources]
+        try:
+            with open(cache_path, "rb") as cache:
+                cached_signature, state = pickle.load(cache)
+            if cached_signature == signature:
+                engine = cls(); engine.rules, engine.block, engine.allow, engine.suffixes = state; return engine
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError): pass
+        if cached_only: return None
+        engine = cls()
+        for path in paths:
+            with open(path, encoding="utf-8", errors="replace") as rules: engine.add_rules(rules)
+        engine.finalize()
+        if suffix_path:
+            with open(suffix_path, encoding="utf-8", errors="replace") as suffixes: engine.load_suffixes(suffixes)
+        try:
+            with open(cache_path + ".tmp", "wb") as cache: pickle.dump((signature, (engine.rules, engine.block, engine.allow, engine.suffixes)), cache, pickle.HIGHEST_PROTOCOL)
+            os.replace(cache_path + ".tmp", cache_path)
+        except OSError: pass
+        return engine
+    def load_suffixes(self, lines):
+        # Public Suffix List format: one rule per line up to the first whitespace, "//" starts a comment.
+        # Internationalized rules are stored in punycode, the form request hosts arrive in.
+        suffixes = set()
+        for line in lines:
+            if not line.strip() or line.startswith("//"): continue
+            rule = line.split()[0].lower(); prefix = "!" if rule.startswith("!") else ""
+            try: suffixes.add(prefix + ".".join(label if label == "*" else label.encode("idna").decode("ascii") for label in rule.lstrip("!").split(".")))
+            except UnicodeError: pass
+        if suffixes: self.suffixes = frozenset(suffixes); self.sites.clear()
+    def add_rules(self, lines):
+        for line in lines:
+            rule = self.parse(line.strip())
+            if rule: self.pending.append(rule)
+    def parse(self, line):
+        if not line or line[0] in "![" or "##" in line or "#@#" in line or "#?#" in line or "#$#" in line: return None
+        exception = line.startswith("@@")
+        if exception: line = line[2:]
+        if len(line) > 1 and line.startswith("/") and line.endswith("/"): return None
+        pattern, options = line.rsplit("$", 1) if "$" in line else (line, "")
+        if len(pattern) > 1 and pattern.startswith("/") and pattern.endswith("/"): return None
+        match_case = False; third_party = None; include = []; exclude = []; types = 0; excluded_types = 0
+        for option in filter(None, options.lower().split(",")):
+            name = option.lstrip("~"); name = self.TYPE_ALIASES.get(name, name)
+            if name in self.TYPES:
+                if option.startswith("~"): excluded_types |= self.TYPES[name]
+                else: types |= self.TYPES[name]
+            elif name in ("third-party", "3p"): third_party = not option.startswith("~")
+            elif name in ("first-party", "1p"): third_party = option.startswith("~")
+            elif option.startswith("domain="):
+                for domain in option[7:].split("|"):
+                    (exclude if domain.startswith("~") else include).append(domain.lstrip("~"))
+            elif option == "match-case": match_case = True
+            elif option not in self.IGNORED_OPTIONS: return None
+        type_mask = (types or self.ALL_TYPES) & ~excluded_types
+        if type_mask & self.TYPES["document"] and not exception: return None
+        if not match_case: pattern = pattern.lower()
+        return exception, pattern, match_case, type_mask, third_party, tuple(include), tuple(exclude)
+    @staticmethod
+    def to_regex(pattern):
+        if pattern in ("", "*"): return None
+        regex = []; i = 0
+        if pattern.startswith("||"): regex.append(r"^[a-z][a-z0-9+.-]*://(?:[^/?#]*\.)?"); i = 2
+        elif pattern.startswith("|"): regex.append("^"); i = 1
+        end = len(pattern) - 1 if pattern.endswith("|") and len(pattern) > i else len(pattern)
+        for char in pattern[i:end]:
+            if char == "*": regex.append(".*")
+            elif char == "^": regex.append(r"(?:[^\w\-.%]|$)")
+            else: regex.append(re.escape(char))
+        if end < len(pattern): regex.append("$")
+        return "".join(regex)
+    def finalize(self):
+        pending = self.pending; self.pending = []
+        # Prefer the token fewest rules share so that buckets stay short.
+        candidates = [self._rule_tokens(rule[1]) for rule in pending]
+        usage = collections.Counter(token for tokens in candidates for token in tokens)
+        for (exception, pattern, match_case, type_mask, third_party, include, exclude), tokens in zip(pending, candidates):
+            hosts, token_index, generic = self.allow if exception else self.block
+            host_rule = self.HOST_RULE_RE.match(pattern)
+            regex = None if host_rule and host_rule.end() == len(pattern) else self.to_regex(pattern)
+            rule_id = len(self.rules); self.rules.append((regex, match_case, type_mask, third_party, include, exclude))
+            if host_rule: hosts.setdefault(host_rule.group(1), []).append(rule_id)
+            elif tokens: token_index.setdefault(min(tokens, key=lambda token: (usage[token], -len(token))), []).append(rule_id)
+            else: generic.append(rule_id)
+    def _rule_tokens(self, pattern):
+        # Only tokens bounded on both sides by a separator (not a wildcard or the pattern edge) are complete URL tokens.
+        start = 2 if pattern.startswith("||") else 1 if pattern.startswith("|") else 0
+        padded = ("/" if start else "*") + pattern[start:].rstrip("|") + ("/" if pattern.endswith("|") else "*")
+        return [match.group() for match in self.TOKEN_RE.finditer(padded.lower())
+                if padded[match.start() - 1] != "*" and padded[match.end()] != "*" and len(match.group()) > 1]
+    def __len__(self): return len(self.rules)
+    @staticmethod
+    def _host_suffixes(host):
+        labels = host.split(".")
+        return [".".join(labels[i:]) for i in range(len(labels))]
+    def _site(self, host):
+        # Registrable domain (eTLD+1) following the Public Suffix List algorithm: the longest matching
+        # suffix rule wins, "*.x" matches any label under x and "!rule" makes rule itself registrable.
+        site = self.sites.get(host)
+        if site is not None: return site
+        labels = host.split("."); site = host if ":" in host or host.replace(".", "").isdigit() else None
+        for i in range(len(labels)):
+            if site is not None: break
+            suffix = ".".join(labels[i:])
+            if "!" + suffix in self.suffixes: site = suffix
+            elif suffix in self.suffixes or (i + 1 < len(labels) and "*." + ".".join(labels[i + 1:]) in self.suffixes):
+                site = ".".join(labels[i - 1:]) if i else host
+        if site is None: site = ".".join(labels[-2:])
+        if len(self.sites) >= 4096: self.sites.clear()
+        self.sites[host] = site
+        return site
+    def _matches(self, rule_id, url, lowered_url, type_bit, third_party, first_party_suffixes):
+        regex, match_case, type_mask, rule_third_party, include, exclude = self.rules[rule_id]
+        if not type_mask & type_bit: return False
+        if rule_third_party is not None and rule_third_party != third_party: return False
+        if include and not any(domain in first_party_suffixes for domain in include): return False
+        if exclude and any(domain in first_party_suffixes for domain in exclude): return False
+        if regex is None: return True
+        compiled = self.regexes.get(rule_id)
+        if compiled is None: compiled = self.regexes[rule_id] = re.compile(regex, 0 if match_case else re.IGNORECASE)
+        return compiled.search(url if match_case else lowered_url) is not None
+    def _lookup(self, index, url, host, type_name, first_party_host):
+        hosts, token_index, generic = index
+        lowered = url.lower(); type_bit = self.TYPES.get(type_name, self.TYPES["other"])
+        third_party = self._site(host) != self._site(first_party_host) if first_party_host else False
+        first_party_suffixes = set(self._host_suffixes(first_party_host)) if first_party_host else set()
+        for suffix in self._host_suffixes(host):
+            for rule_id in hosts.get(suffix, ()):
+                if self._matches(rule_id, url, lowered, type_bit, third_party, first_party_suffixes): return True
+        for token in set(self.TOKEN_RE.findall(lowered)):
+            for rule_id in token_index.get(token, ()):
+                if self._matches(rule_id, url, lowered, type_bit, third_party, first_party_suffixes): return True
+        for rule_id in generic:
+            if self._matches(rule_id, url, lowered, type_bit, third_party, first_party_suffixes): return True
+        return False
+    def should_block(self, url, host, type_name="other", first_party_url="", first_party_host=""):
+        if not self._lookup(self.block, url, host, type_name, first_party_host): return False
+        if self._lookup(self.allow, url, host, type_name, first_party_host): return False
+        return not (first_party_url and self._lookup(self.allow, first_party_url, first_party_host, "document", first_party_host))
 
 class CustomWebEnginePage(QWebEnginePage):
     def __init__(self, profile, main_window, parent=None):
@@ -78,7 +788,29 @@ class CustomWebEnginePage(QWebEnginePage):
             return False
         return super().acceptNavigationRequest(url, _type, isMainFrame)
 
+class RequestBlocker(QWebEngineUrlRequestInterceptor):
+    # One per page, so that every tab counts its own blocked requests; the compiled FilterEngine is shared
+    # and attached once it has loaded in the background.
+    blockedCountChanged = pyqtSignal(int)
+    RESOURCE_TYPES = {QWebEngineUrlRequestInfo.ResourceTypeScript: "script", QWebEngineUrlRequestInfo.ResourceTypeImage: "image",
+                      QWebEngineUrlRequestInfo.ResourceTypeStylesheet: "stylesheet", QWebEngineUrlRequestInfo.ResourceTypeObject: "object",
+                      QWebEngineUrlRequestInfo.ResourceTypeXhr: "xmlhttprequest", QWebEngineUrlRequestInfo.ResourceTypeSubFrame: "subdocument",
+                      QWebEngineUrlRequestInfo.ResourceTypePing: "ping", QWebEngineUrlRequestInfo.ResourceTypeMedia: "media",
+                      QWebEngineUrlRequestInfo.ResourceTypeFontResource: "font", QWebEngineUrlRequestInfo.ResourceTypeSubResource: "other"}
+    def __init__(self, engine, parent=None):
+        super().__init__(parent); self.engine = engine; self.blocked = 0
+    def interceptRequest(self, info):
+        resource_type = info.resourceType()
+        if resource_type == QWebEngineUrlRequestInfo.ResourceTypeMainFrame:
+            self.blocked = 0; self.blockedCountChanged.emit(0); return
+        if self.engine is None: return
+        url = info.requestUrl(); first_party = info.firstPartyUrl()
+        if url.scheme() not in ("http", "https", "ws", "wss"): return
+        if self.engine.should_block(url.toString(), url.host().lower(), self.RESOURCE_TYPES.get(resource_type, "other"), first_party.toString(), first_party.host().lower()):
+            info.block(True); self.blocked += 1; self.blockedCountChanged.emit(self.blocked)
+
 class SettingsDialog(QDialog):
+    cacheUsageComputed = pyqtSignal(str)
     def __init__(self, config, db_manager, parent=None):
         super().__init__(parent)
         self.db_manager = db_manager; self.main_window = parent; self.config = config
@@ -97,14 +829,33 @@ class SettingsDialog(QDialog):
         form_layout.addRow("", self.clear_history_button); form_layout.addRow("", self.clear_bookmarks_button)
         self.cache_check = QCheckBox("Enable persistent disk cache (faster loading)"); self.cache_check.setChecked(self.config.getboolean('performance', 'persistent_cache', fallback=False))
         form_layout.addRow(QLabel("<b>Performance:</b>"), self.cache_check)
+        self.cache_size_spin = QSpinBox(); self.cache_size_spin.setRange(0, 100000); self.cache_size_spin.setSingleStep(64)
+        self.cache_size_spin.setSuffix(" MB"); self.cache_size_spin.setSpecialValueText("Automatic")
+        self.cache_size_spin.setValue(self.config.getint('performance', 'cache_size_mb', fallback=0))
+        form_layout.addRow("Maximum cache size:", self.cache_size_spin)
+        self.cache_usage_label = QLabel("Calculating..."); form_layout.addRow("Cache usage:", self.cache_usage_label)
+        self.cacheUsageComputed.connect(self.cache_usage_label.setText); self.update_cache_usage()
+        self.cache_warming_check = QCheckBox("Pre-load frequently visited sites while idle"); self.cache_warming_check.setChecked(self.config.getboolean('performance', 'cache_warming', fallback=False))
+        form_layout.addRow("", self.cache_warming_check)
         self.clear_cache_button = QPushButton("Clear Cache Now"); self.clear_cache_button.clicked.connect(self.clear_cache)
         form_layout.addRow("", self.clear_cache_button)
+        self.performance_button = QPushButton("Page Load Statistics..."); self.performance_button.clicked.connect(self.main_window.show_performance)
+        form_layout.addRow("", self.performance_button)
         restart_note = QLabel("<i>Some changes (like cache) require a restart to take effect.</i>"); restart_note.setStyleSheet("color: #aaa;")
         form_layout.addRow("", restart_note)
         layout.addLayout(form_layout)
         button_box = QDialogButtonBox(QDialogButtonBox.Save | QDialogButtonBox.Cancel); button_box.accepted.connect(self.accept); button_box.rejected.connect(self.reject)
         layout.addWidget(button_box)
-    def clear_cache(self): self.main_window.clear_cache(); self.clear_cache_button.setText("Cache Cleared!"); self.clear_cache_button.setEnabled(False)
+    def clear_cache(self): self.main_window.clear_cache(); self.clear_cache_button.setText("Cache Cleared!"); self.clear_cache_button.setEnabled(False); self.update_cache_usage()
+    def update_cache_usage(self):
+        # Walking a large cache directory takes a while, so it is done on a worker thread.
+        profile = self.main_window.profile
+        if profile.httpCacheType() != QWebEngineProfile.DiskHttpCache: self.cache_usage_label.setText("In memory only"); return
+        path, limit = profile.cachePath(), profile.httpCacheMaximumSize()
+        def compute():
+            used = format_size(directory_size(path))
+            self.cacheUsageComputed.emit(f"{used} of {format_size(limit)}" if limit else used)
+        threading.Thread(target=compute, name="CacheUsage", daemon=True).start()
     def clear_history(self): self.db_manager.clear_history(); self.clear_history_button.setText("History Cleared!"); self.clear_history_button.setEnabled(False)
     def clear_bookmarks(self): self.db_manager.clear_bookmarks(); self.clear_bookmarks_button.setText("Bookmarks Cleared!"); self.clear_bookmarks_button.setEnabled(False)
     def accept(self):
@@ -112,86 +863,536 @@ class SettingsDialog(QDialog):
         if not self.config.has_section('tabs'): self.config.add_section('tabs'); self.config.set('tabs', 'restore_session', str(self.restore_session_check.isChecked()))
         if not self.config.has_section('privacy'): self.config.add_section('privacy'); self.config.set('privacy', 'cookie_policy', str(self.cookie_policy_combo.currentIndex()))
         if not self.config.has_section('performance'): self.config.add_section('performance'); self.config.set('performance', 'persistent_cache', str(self.cache_check.isChecked()))
+        self.config.set('performance', 'cache_size_mb', str(self.cache_size_spin.value())); self.config.set('performance', 'cache_warming', str(self.cache_warming_check.isChecked()))
         super().accept()
 
 class HistoryDialog(QDialog):
+    PAGE_SIZE = 100
     def __init__(self, db_manager, parent=None):
-        super().__init__(parent); self.main_window = parent; self.setWindowTitle("History"); self.setMinimumSize(600, 400)
-        layout = QVBoxLayout(self); self.list_widget = QListWidget()
-        for title, url in db_manager.get_history():
+        super().__init__(parent); self.db = db_manager; self.main_window = parent; self.setWindowTitle("History"); self.setMinimumSize(600, 400)
+        layout = QVBoxLayout(self)
+        self.search_edit = QLineEdit(); self.search_edit.setPlaceholderText("Search history..."); self.search_edit.setClearButtonEnabled(True)
+        self.search_timer = QTimer(self); self.search_timer.setSingleShot(True); self.search_timer.setInterval(150); self.search_timer.timeout.connect(self.reload)
+        self.search_edit.textChanged.connect(self.search_timer.start)
+        layout.addWidget(self.search_edit)
+        self.list_widget = QListWidget()
+        self.list_widget.itemClicked.connect(self.item_clicked); self.list_widget.verticalScrollBar().valueChanged.connect(self.on_scrolled)
+        layout.addWidget(self.list_widget)
+        self.reload()
+    def reload(self):
+        self.list_widget.clear(); self.last_key = None; self.exhausted = False; self.fetch_more()
+    def fetch_more(self):
+        if self.exhausted: return
+        rows = self.db.get_history(self.search_edit.text(), self.last_key, self.PAGE_SIZE)
+        for row_id, title, url, sort_key in rows:
             item = QListWidgetItem(f"{title}\n{url}"); item.setData(Qt.UserRole, url); self.list_widget.addItem(item)
-        self.list_widget.itemClicked.connect(self.item_clicked); layout.addWidget(self.list_widget)
+        if rows: self.last_key = (rows[-1][3], rows[-1][0])
+        self.exhausted = len(rows) < self.PAGE_SIZE
+    def on_scrolled(self, value):
+        if value >= self.list_widget.verticalScrollBar().maximum() - 5: self.fetch_more()
     def item_clicked(self, item): url = item.data(Qt.UserRole); self.main_window.add_new_tab(QUrl(url), "History"); self.close()
 
+class PerformanceDialog(QDialog):
+    COLUMNS = ("Domain", "Loads", "p50 load (ms)", "p95 load (ms)", "p50 TTFB (ms)", "From cache", "Failed")
+    def __init__(self, db_manager, parent=None):
+        super().__init__(parent); self.db = db_manager
+        self.setWindowTitle("Performance"); self.setMinimumSize(760, 460)
+        layout = QVBoxLayout(self)
+        self.samples = [dict(zip(DatabaseManager.PAGE_LOAD_COLUMNS, row)) for row in self.db.get_page_loads()]
+        self.summary_label = QLabel(); layout.addWidget(self.summary_label)
+        self.table = QTableWidget(0, len(self.COLUMNS)); self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch); self.table.verticalHeader().hide()
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers); self.table.setSortingEnabled(True)
+        layout.addWidget(self.table)
+        button_layout = QHBoxLayout()
+        self.export_csv_button = QPushButton("Export CSV"); self.export_csv_button.clicked.connect(self.export_csv)
+        self.export_json_button = QPushButton("Export JSON"); self.export_json_button.clicked.connect(self.export_json)
+        button_layout.addStretch(); button_layout.addWidget(self.export_csv_button); button_layout.addWidget(self.export_json_button)
+        layout.addLayout(button_layout)
+        self.populate()
+    @staticmethod
+    def summarize(samples):
+        loads = sorted(s['load_ms'] for s in samples if s['ok']); ttfbs = sorted(s['ttfb_ms'] for s in samples if s['ok'] and s['ttfb_ms'] is not None)
+        return {'loads': len(samples), 'p50_load_ms': percentile(loads, 0.5), 'p95_load_ms': percentile(loads, 0.95), 'p50_ttfb_ms': percentile(ttfbs, 0.5),
+                'from_cache': sum(1 for s in samples if s['from_cache']), 'failed': sum(1 for s in samples if not s['ok'])}
+    def by_key(self, key):
+        groups = collections.defaultdict(list)
+        for sample in self.samples: groups[key(sample)].append(sample)
+        return {group: self.summarize(samples) for group, samples in groups.items()}
+    def populate(self):
+        domains = self.by_key(lambda s: s['domain'])
+        self.table.setSortingEnabled(False); self.table.setRowCount(len(domains))
+        for row, (domain, summary) in enumerate(domains.items()):
+            values = (domain, summary['loads'], summary['p50_load_ms'], summary['p95_load_ms'], summary['p50_ttfb_ms'], summary['from_cache'], summary['failed'])
+            for column, value in enumerate(values):
+                item = QTableWidgetItem()
+                if isinstance(value, float): item.setData(Qt.DisplayRole, round(value))
+                elif value is not None: item.setData(Qt.DisplayRole, value)
+                self.table.setItem(row, column, item)
+        self.table.setSortingEnabled(True); self.table.sortItems(1, Qt.DescendingOrder)
+        lines = [f"{len(self.samples)} page loads in the last {DatabaseManager.METRICS_RETENTION // 86400} days."]
+        for (cache_mode, cookie_policy), summary in sorted(self.by_key(lambda s: (s['cache_mode'], s['cookie_policy'])).items(), key=str):
+            if summary['p50_load_ms'] is None: continue
+            lines.append(f"{cache_mode} cache, cookie policy {cookie_policy}: p50 {summary['p50_load_ms']:.0f} ms, p95 {summary['p95_load_ms']:.0f} ms over {summary['loads']} loads")
+        self.summary_label.setText("\n".join(lines))
+    def export_csv(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Page Loads", "page_loads.csv", "CSV (*.csv)")
+        if not path: return
+        with open(path, 'w', newline='') as export:
+            writer = csv.DictWriter(export, DatabaseManager.PAGE_LOAD_COLUMNS); writer.writeheader(); writer.writerows(self.samples)
+    def export_json(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Page Loads", "page_loads.json", "JSON (*.json)")
+        if not path: return
+        with open(path, 'w') as export:
+            json.dump({'domains': self.by_key(lambda s: s['domain']), 'samples': self.samples}, export, indent=2)
+
+BOOKMARK_SCHEMES = ("http", "https", "ftp", "file")
+
+def split_tags(text): return tuple(dict.fromkeys(tag.strip() for tag in text.split(',') if tag.strip()))
+
+class NetscapeBookmarkParser(HTMLParser):
+    # Netscape bookmark files, as exported by all major browsers: folders are <H3> headings followed by a nested <DL>.
+    def __init__(self):
+        super().__init__(); self.entries = []; self.folders = []; self.pending_folder = None; self.link = None; self.text = None
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a': self.link = dict(attrs); self.text = []
+        elif tag == 'h3': self.text = []
+        elif tag == 'dl': self.folders.append(self.pending_folder); self.pending_folder = None
+    def handle_data(self, data):
+        if self.text is not None: self.text.append(data)
+    def handle_endtag(self, tag):
+        if tag == 'a' and self.link is not None:
+            url = self.link.get('href') or ''
+            if url.split(':', 1)[0].lower() in BOOKMARK_SCHEMES:
+                try: added = float(self.link.get('add_date') or 0)
+                except ValueError: added = 0
+                self.entries.append((url, "".join(self.text).strip() or url, tuple(name for name in self.folders if name), split_tags(self.link.get('tags') or ''), added))
+            self.link = self.text = None
+        elif tag == 'h3' and self.text is not None: self.pending_folder = "".join(self.text).strip() or "Untitled"; self.text = None
+        elif tag == 'dl' and self.folders: self.folders.pop()
+
+def read_netscape_bookmarks(file, chunk_size=1 << 16):
+    parser = NetscapeBookmarkParser()
+    while True:
+        chunk = file.read(chunk_size)
+        if chunk: parser.feed(chunk)
+        else: parser.close()
+        yield from parser.entries; parser.entries = []
+        if not chunk: return
+
+def json_bookmark_entry(entry):
+    # Entries that are not objects or have no usable URL are skipped; a single folder name or a
+    # comma-separated tag string is accepted in place of a list, and names that are not strings or numbers are dropped.
+    if not isinstance(entry, dict) or not isinstance(entry.get('url'), str): return None
+    url = entry['url']
+    if url.split(':', 1)[0].lower() not in BOOKMARK_SCHEMES: return None
+    title = entry.get('title'); folder = entry.get('folder') or (); tags = entry.get('tags') or ()
+    if isinstance(folder, str): folder = (folder,)
+    if isinstance(tags, str): tags = split_tags(tags)
+    if not isinstance(folder, (list, tuple)) or not isinstance(tags, (list, tuple)): return None
+    try: added = float(entry.get('added') or 0)
+    except (TypeError, ValueError): added = 0
+    folder = [str(name).strip() for name in folder if isinstance(name, (str, int, float)) and not isinstance(name, bool)]
+    tags = [str(tag).strip() for tag in tags if isinstance(tag, (str, int, float)) and not isinstance(tag, bool)]
+    return (url, title if isinstance(title, str) and title else url, tuple(name for name in folder if name),
+            tuple(dict.fromkeys(tag for tag in tags if tag)), added)
+
+def read_json_bookmarks(file, chunk_size=1 << 16):
+    # Reads the array written by write_json_bookmarks one object at a time instead of parsing the whole file.
+    decoder = json.JSONDecoder(); buffer = ""; started = False
+    while True:
+        chunk = file.read(chunk_size); buffer += chunk
+        while True:
+            buffer = buffer.lstrip(" \t\r\n,")
+            if not started:
+                if not buffer: break
+                if buffer[0] != '[': raise ValueError("not a JSON bookmark list")
+                buffer = buffer[1:]; started = True; continue
+            if buffer.startswith(']'): return
+            try: entry, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError as error:
+                # Only an entry cut off at the end of the buffer can be completed by the next chunk; anything
+                # failing earlier is malformed and would otherwise pull the rest of the file into the buffer.
+                if error.pos < len(buffer) - 8 and not error.msg.startswith("Unterminated string"): raise ValueError("malformed JSON bookmark entry") from None
+                break
+            buffer = buffer[end:]
+            entry = json_bookmark_entry(entry)
+            if entry: yield entry
+        if not chunk:
+            if buffer.strip(): raise ValueError("truncated JSON bookmark list")
+            return
+
+def walk_bookmarks(db_manager, folder_id=0, path=()):
+    # Yields (folder path, bookmark row) depth first, folders before the bookmarks next to them.
+    for child_id, name in db_manager.get_bookmark_folders(folder_id): yield from walk_bookmarks(db_manager, child_id, path + (name,))
+    for row in db_manager.iter_bookmarks(folder_id): yield path, row
+
+def write_json_bookmarks(file, db_manager):
+    count = 0; file.write("[")
+    for path, (_, title, url, tags, added) in walk_bookmarks(db_manager):
+        entry = {'url': url, 'title': title, 'folder': list(path), 'tags': list(split_tags(tags or '')), 'added': added}
+        file.write(("\n" if not count else ",\n") + json.dumps(entry, ensure_ascii=False)); count += 1
+    file.write("\n]\n"); return count
+
+def write_netscape_bookmarks(file, db_manager):
+    file.write("<!DOCTYPE NETSCAPE-Bookmark-file-1>\n<META HTTP-EQUIV=\"Content-Type\" CONTENT=\"text/html; charset=UTF-8\">\n"
+               "<TITLE>Bookmarks</TITLE>\n<H1>Bookmarks</H1>\n")
+    def write_folder(folder_id, indent):
+        count = 0; file.write(f"{indent}<DL><p>\n")
+        for child_id, name in db_manager.get_bookmark_folders(folder_id):
+            file.write(f"{indent}    <DT><H3>{html.escape(name)}</H3>\n"); count += write_folder(child_id, indent + "    ")
+        for _, title, url, tags, added in db_manager.iter_bookmarks(folder_id):
+            tag_attr = f' TAGS="{html.escape(tags)}"' if tags else ""
+            file.write(f'{indent}    <DT><A HREF="{html.escape(url)}" ADD_DATE="{int(added)}"{tag_attr}>{html.escape(title)}</A>\n'); count += 1
+        file.write(f"{indent}</DL><p>\n"); return count
+    return write_folder(0, "")
+
+class BookmarkNode:
+    __slots__ = ("id", "parent", "row", "title", "url", "tags", "children", "after", "folders_loaded", "exhausted")
+    def __init__(self, node_id, parent, title, url=None, tags=""):
+        self.id = node_id; self.parent = parent; self.row = 0; self.title = title; self.url = url; self.tags = tags or ""
+        self.children = []; self.after = None; self.folders_loaded = False; self.exhausted = url is not None
+
+class BookmarkModel(QAbstractItemModel):
+    # Folders and bookmarks are fetched from the database a page at a time as the view scrolls or expands a
+    # folder. Deleting a row or adding a folder updates the loaded rows in place instead of resetting the model.
+    PAGE_SIZE = 200; COLUMNS = ("Title", "URL", "Tags")
+    def __init__(self, db_manager, parent=None):
+        super().__init__(parent); self.db = db_manager; self.root = BookmarkNode(0, None, "")
+        self.folder_icon = QApplication.style().standardIcon(QStyle.SP_DirIcon)
+    def node(self, index): return index.internalPointer() if index.isValid() else self.root
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent): return QModelIndex()
+        return self.createIndex(row, column, self.node(parent).children[row])
+    def parent(self, index):
+        if not index.isValid(): return QModelIndex()
+        parent = index.internalPointer().parent
+        return QModelIndex() if parent is self.root else self.createIndex(parent.row, 0, parent)
+    def rowCount(self, parent=QModelIndex()): return 0 if parent.column() > 0 else len(self.node(parent).children)
+    def columnCount(self, parent=QModelIndex()): return len(self.COLUMNS)
+    def hasChildren(self, parent=QModelIndex()):
+        node = self.node(parent); return bool(node.children) or not node.exhausted
+    def canFetchMore(self, parent): return not self.node(parent).exhausted
+    def fetchMore(self, parent):
+        node = self.node(parent); rows = []
+        if not node.folders_loaded:
+            rows += [BookmarkNode(folder_id, node, name) for folder_id, name in self.db.get_bookmark_folders(node.id)]; node.folders_loaded = True
+        page = self.db.get_bookmark_page(node.id, node.after, self.PAGE_SIZE)
+        rows += [BookmarkNode(bookmark_id, node, title, url, tags) for bookmark_id, title, url, tags, _ in page]
+        if page: node.after = (page[-1][1], page[-1][0])
+        if len(page) < self.PAGE_SIZE: node.exhausted = True
+        if not rows: return
+        start = len(node.children)
+        self.beginInsertRows(parent, start, start + len(rows) - 1)
+        for row, child in enumerate(rows, start): child.row = row
+        node.children.extend(rows); self.endInsertRows()
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid(): return None
+        node = index.internalPointer(); column = index.column()
+        if role in (Qt.DisplayRole, Qt.EditRole): return (node.title, node.url or "", node.tags.replace(',', ', '))[column]
+        if role == Qt.UserRole: return node.url
+        if role == Qt.ToolTipRole and node.url: return node.url
+        if role == Qt.DecorationRole and column == 0 and node.url is None: return self.folder_icon
+        return None
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid() and index.column() == 2 and index.internalPointer().url is not None: flags |= Qt.ItemIsEditable
+        return flags
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not self.flags(index) & Qt.ItemIsEditable: return False
+        node = index.internalPointer(); tags = split_tags(value)
+        self.db.set_bookmark_tags(node.id, tags); node.tags = ",".join(tags); self.dataChanged.emit(index, index)
+        return True
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole: return self.COLUMNS[section]
+        return None
+    def add_folder(self, parent, name):
+        # Folders are listed first, sorted by name; a parent whose folders are not loaded yet picks it up when fetched.
+        node = self.node(parent); folder_id = self.db.add_bookmark_folder(name, node.id)
+        if not node.folders_loaded: return
+        folders = [child for child in node.children if child.url is None]
+        if any(child.id == folder_id for child in folders): return
+        row = bisect.bisect([child.title for child in folders], name)
+        self.beginInsertRows(parent, row, row)
+        node.children.insert(row, BookmarkNode(folder_id, node, name)); self.renumber(node, row)
+        self.endInsertRows()
+    def remove(self, index):
+        node = index.internalPointer(); parent = node.parent
+        if node.url is None: self.db.delete_bookmark_folder(node.id)
+        else: self.db.delete_bookmark(node.url)
+        self.beginRemoveRows(self.parent(index), node.row, node.row)
+        del parent.children[node.row]; self.renumber(parent, node.row)
+        self.endRemoveRows()
+    @staticmethod
+    def renumber(node, start):
+        for row in range(start, len(node.children)): node.children[row].row = row
+    def reload(self):
+        self.beginResetModel(); self.root = BookmarkNode(0, None, ""); self.endResetModel()
+
 class BookmarksDialog(QDialog):
+    importFinished = pyqtSignal(object, object)
     def __init__(self, db_manager, parent=None):
         super().__init__(parent)
         self.db = db_manager; self.main_window = parent
-        self.setWindowTitle("Manage Bookmarks"); self.setMinimumSize(600, 400)
+        self.setWindowTitle("Manage Bookmarks"); self.setMinimumSize(700, 450)
         layout = QVBoxLayout(self)
-        self.list_widget = QListWidget()
-        self.update_list()
-        self.list_widget.itemClicked.connect(self.item_clicked)
-        layout.addWidget(self.list_widget)
+        self.model = BookmarkModel(self.db, self)
+        self.tree = QTreeView(); self.tree.setModel(self.model); self.tree.setUniformRowHeights(True)
+        self.tree.setEditTriggers(QTreeView.DoubleClicked | QTreeView.EditKeyPressed); self.tree.setColumnWidth(0, 280); self.tree.setColumnWidth(1, 260)
+        self.tree.clicked.connect(self.item_clicked)
+        layout.addWidget(self.tree)
+        self.status_label = QLabel(); layout.addWidget(self.status_label)
         
         button_layout = QHBoxLayout()
+        self.new_folder_button = QPushButton("New Folder"); self.new_folder_button.clicked.connect(self.new_folder)
         self.delete_button = QPushButton("Delete Selected")
         self.delete_button.clicked.connect(self.delete_bookmark)
-        button_layout.addWidget(self.delete_button)
+        self.import_button = QPushButton("Import..."); self.import_button.clicked.connect(self.import_bookmarks)
+        self.export_button = QPushButton("Export..."); self.export_button.clicked.connect(self.export_bookmarks)
+        for button in (self.new_folder_button, self.delete_button, self.import_button, self.export_button): button_layout.addWidget(button)
         layout.addLayout(button_layout)
+        self.importFinished.connect(self.on_import_finished)
 
-    def update_list(self):
-        self.list_widget.clear()
-        for title, url in self.db.get_bookmarks():
-            item = QListWidgetItem(f"{title}\n{url}"); item.setData(Qt.UserRole, url); self.list_widget.addItem(item)
-    def item_clicked(self, item):
-        url = item.data(Qt.UserRole); self.main_window.add_new_tab(QUrl(url), "Bookmark"); self.close()
+    def item_clicked(self, index):
+        url = index.data(Qt.UserRole)
+        if url and index.column() != 2: self.main_window.add_new_tab(QUrl(url), "Bookmark"); self.close()
+    def new_folder(self):
+        parent = self.tree.currentIndex()
+        if parent.isValid() and parent.data(Qt.UserRole): parent = parent.parent()
+        if parent.isValid(): parent = parent.sibling(parent.row(), 0)
+        name, ok = QInputDialog.getText(self, "New Folder", "Folder name:")
+        if ok and name.strip(): self.model.add_folder(parent, name.strip())
     def delete_bookmark(self):
-        current_item = self.list_widget.currentItem()
-        if current_item:
-            url = current_item.data(Qt.UserRole); self.db.delete_bookmark(url); self.update_list()
+        index = self.tree.currentIndex()
+        if not index.isValid(): return
+        index = index.sibling(index.row(), 0)
+        if index.data(Qt.UserRole) is None and QMessageBox.question(self, "Delete Folder", f"Delete \"{index.data()}\" and everything in it?") != QMessageBox.Yes: return
+        self.model.remove(index)
+    def import_bookmarks(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Import Bookmarks", "", "Bookmarks (*.html *.htm *.json)")
+        if not path: return
+        self.import_button.setEnabled(False); self.status_label.setText("Importing...")
+        # Parsing and inserting run on a worker thread; the omnibox index is rebuilt there too instead of
+        # being updated once per imported bookmark.
+        self.db.begin_url_index_rebuild()
+        def run():
+            read = read_json_bookmarks if path.lower().endswith('.json') else read_netscape_bookmarks
+            result = index = None
+            try:
+                with open(path, encoding='utf-8', errors='replace') as file: result = self.db.import_bookmarks(read(file))
+            except Exception as e: result = e
+            finally:
+                # Always report back, so that the dialog is reset and the index rebuild is finished or abandoned.
+                try: index = self.db.build_url_index()
+                except Exception as e: result = result if isinstance(result, Exception) else e
+                self.importFinished.emit(result, index)
+        threading.Thread(target=run, name="BookmarkImport", daemon=True).start()
+    def on_import_finished(self, result, index):
+        if index is not None: self.db.install_url_index(index)
+        else: self.db.cancel_url_index_rebuild()
+        self.model.reload(); self.import_button.setEnabled(True)
+        self.status_label.setText(f"Import failed: {result}" if isinstance(result, Exception) else f"Imported {result} bookmarks.")
+    def export_bookmarks(self):
+        path, selected = QFileDialog.getSaveFileName(self, "Export Bookmarks", "bookmarks.html", "Bookmarks HTML (*.html);;JSON (*.json)")
+        if not path: return
+        write = write_json_bookmarks if path.lower().endswith('.json') or selected.startswith("JSON") else write_netscape_bookmarks
+        try:
+            with open(path, 'w', encoding='utf-8') as file: count = write(file, self.db)
+        except OSError as e: self.status_label.setText(f"Export failed: {e}"); return
+        self.status_label.setText(f"Exported {count} bookmarks.")
 
 class DownloadItemWidget(QWidget):
+    # Progress is not tracked per downloadProgress signal; DownloadsDialog polls all running downloads at REFRESH_HZ.
+    SPEED_SMOOTHING = 0.3
     def __init__(self, download_item: QWebEngineDownloadItem, parent=None):
         super().__init__(parent)
-        self.item = download_item
+        self.item = download_item; self.paused = False; self.started = time.time()
+        self.active_time = 0.0; self.last_tick = time.monotonic(); self.last_received = download_item.receivedBytes(); self.speed = None
         layout = QHBoxLayout(self)
         self.label = QLabel(os.path.basename(download_item.path()))
-        self.progress = QProgressBar()
-        layout.addWidget(self.label); layout.addWidget(self.progress)
-        download_item.downloadProgress.connect(self.update_progress)
-        download_item.finished.connect(self.on_finished)
-    def update_progress(self, received, total):
+        self.progress = QProgressBar(); self.status = QLabel(); self.status.setMinimumWidth(150)
+        self.pause_btn = QPushButton("Pause"); self.cancel_btn = QPushButton("Cancel")
+        layout.addWidget(self.label); layout.addWidget(self.progress); layout.addWidget(self.status)
+        layout.addWidget(self.pause_btn); layout.addWidget(self.cancel_btn)
+        self.cancel_btn.clicked.connect(download_item.cancel)
+    def refresh(self, now, queued=False):
+        received, total = self.item.receivedBytes(), self.item.totalBytes()
+        elapsed = now - self.last_tick; self.last_tick = now
+        if not self.paused and elapsed > 0:
+            self.active_time += elapsed; rate = (received - self.last_received) / elapsed
+            self.speed = rate if self.speed is None else (1 - self.SPEED_SMOOTHING) * self.speed + self.SPEED_SMOOTHING * rate
+        self.last_received = received
+        # setValue and setText return early when nothing changed, so idle downloads cause no repaints.
         if total > 0: self.progress.setValue(int(100 * received / total))
-    def on_finished(self):
-        self.label.setText(f"{self.label.text()} (Completed)")
-        self.progress.hide()
+        if queued: status = "Queued"
+        elif self.paused: status = "Paused"
+        elif self.speed is None: status = "Starting..."
+        else:
+            status = f"{format_size(self.speed)}/s"
+            if total > 0 and self.speed > 0: status += f", {format_duration((total - received) / self.speed)} left"
+        self.status.setText(status); self.pause_btn.setText("Resume" if self.paused and not queued else "Pause")
 
 class DownloadsDialog(QDialog):
-    def __init__(self, parent=None):
+    # Running downloads are shown above the list of finished ones, which is kept in the database.
+    # At most max_concurrent_downloads run at a time; the others are paused and queued in arrival order.
+    REFRESH_HZ = 10; RECORD_LIMIT = 500
+    STATES = {QWebEngineDownloadItem.DownloadCompleted: "completed", QWebEngineDownloadItem.DownloadCancelled: "cancelled",
+              QWebEngineDownloadItem.DownloadInterrupted: "interrupted"}
+    def __init__(self, db_manager, config, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Downloads"); self.setMinimumSize(500, 300)
-        self.layout = QVBoxLayout(self)
+        self.db_manager = db_manager; self.max_active = max(1, config.getint('performance', 'max_concurrent_downloads', fallback=3))
+        self.active = []; self.queue = collections.deque()
+        self.timer = QTimer(self); self.timer.setInterval(1000 // self.REFRESH_HZ); self.timer.timeout.connect(self.refresh)
+        self.layout = QVBoxLayout(self); self.active_layout = QVBoxLayout(); self.layout.addLayout(self.active_layout)
+        self.history_list = QListWidget(); self.history_list.setUniformItemSizes(True)
+        self.clear_button = QPushButton("Clear List"); self.clear_button.clicked.connect(self.clear_history)
+        self.layout.addWidget(self.history_list); self.layout.addWidget(self.clear_button)
+        for record in self.db_manager.get_downloads(self.RECORD_LIMIT): self.history_list.addItem(self.record_item(*record))
     def add_download(self, download_item):
-        item_widget = DownloadItemWidget(download_item)
-        self.layout.addWidget(item_widget)
+        widget = DownloadItemWidget(download_item)
+        widget.pause_btn.clicked.connect(lambda _=False, w=widget: self.toggle_pause(w))
+        download_item.finished.connect(lambda w=widget: self.on_finished(w))
+        if sum(1 for w in self.active if not w.paused) >= self.max_active: self.enqueue(widget)
+        self.active.append(widget); self.active_layout.addWidget(widget)
+        widget.refresh(time.monotonic(), widget in self.queue); self.timer.start()
+    def enqueue(self, widget):
+        widget.paused = True; widget.item.pause(); self.queue.append(widget)
+    def start_queued(self):
+        running = sum(1 for w in self.active if not w.paused)
+        while self.queue and running < self.max_active:
+            widget = self.queue.popleft(); widget.paused = False; widget.item.resume(); running += 1
+    def toggle_pause(self, widget):
+        # Pausing a queued download takes it out of the queue; resuming puts it back at the end.
+        if widget in self.queue: self.queue.remove(widget)
+        elif widget.paused: self.queue.append(widget)
+        else: widget.paused = True; widget.item.pause()
+        self.start_queued(); widget.refresh(time.monotonic(), widget in self.queue)
+    def refresh(self):
+        now = time.monotonic()
+        for widget in self.active: widget.refresh(now, widget in self.queue)
+        if not self.active: self.timer.stop()
+    def on_finished(self, widget):
+        widget.refresh(time.monotonic()); item = widget.item
+        if widget in self.queue: self.queue.remove(widget)
+        self.active.remove(widget); self.active_layout.removeWidget(widget); widget.deleteLater()
+        size, duration, state = item.receivedBytes(), widget.active_time, self.STATES.get(item.state(), "interrupted")
+        self.db_manager.add_download(item.url().toString(), item.path(), size, widget.started, duration, state)
+        self.history_list.insertItem(0, self.record_item(item.path(), size, widget.started, duration, size / duration if duration > 0 else None, state))
+        self.start_queued()
+    @staticmethod
+    def record_item(path, size, started, duration, average_speed, state):
+        text = f"{os.path.basename(path)} - {format_size(size)} in {format_duration(duration)}"
+        if average_speed: text += f" ({format_size(average_speed)}/s)"
+        if state != "completed": text += f" [{state}]"
+        item = QListWidgetItem(text); item.setToolTip(f"{path}\n{time.strftime('%Y-%m-%d %H:%M', time.localtime(started))}")
+        return item
+    def clear_history(self): self.db_manager.clear_downloads(); self.history_list.clear()
+
+class CacheWarmer(QObject):
+    # Loads the most frecent history URLs into the disk cache while the browser is idle. It uses a single hidden
+    # page, loads one URL at a time with a pause in between, and stops as soon as the user is active again.
+    IDLE_SECONDS = 60; CHECK_INTERVAL_MS = 15000; PAUSE_MS = 2000; PAGE_TIMEOUT_MS = 30000; REWARM_SECONDS = 6 * 3600
+    def __init__(self, profile, db_manager, count):
+        super().__init__(profile)
+        self.profile = profile; self.db = db_manager; self.count = count; self.filter_engine = None
+        self.page = None; self.current = None; self.pending = []; self.last_run = None
+        self.timer = QTimer(self); self.timer.timeout.connect(self.check_idle); self.timer.start(self.CHECK_INTERVAL_MS)
+        self.next_timer = QTimer(self); self.next_timer.setSingleShot(True); self.next_timer.timeout.connect(self.load_next)
+    def set_filter_engine(self, engine):
+        self.filter_engine = engine
+        if self.page is not None: self.page.blocker.engine = engine
+    def check_idle(self):
+        if not SecureBrowser.is_idle(self.IDLE_SECONDS): self.stop(); return
+        if self.page is not None: return
+        if not self.pending and (self.last_run is None or time.monotonic() - self.last_run > self.REWARM_SECONDS):
+            self.last_run = time.monotonic(); self.pending = self.db.get_top_sites(self.count)[::-1]
+        if self.pending: self.load_next()
+    def load_next(self):
+        self.current = None
+        if not self.pending or not SecureBrowser.is_idle(self.IDLE_SECONDS): self.stop(); return
+        if self.page is None:
+            self.page = QWebEnginePage(self.profile, self); self.page.setAudioMuted(True)
+            self.page.blocker = RequestBlocker(self.filter_engine, self.page); self.page.setUrlRequestInterceptor(self.page.blocker)
+            self.page.loadFinished.connect(lambda ok: self.next_timer.start(self.PAUSE_MS))
+        self.current = self.pending.pop(); self.page.setUrl(QUrl(self.current)); self.next_timer.start(self.PAGE_TIMEOUT_MS)
+    def stop(self):
+        # An interrupted URL is loaded again on the next idle period.
+        self.next_timer.stop()
+        if self.current is not None: self.pending.append(self.current); self.current = None
+        if self.page is not None: self.page.triggerAction(QWebEnginePage.Stop); self.page.deleteLater(); self.page = None
+    def shutdown(self): self.stop(); self.timer.stop(); self.deleteLater()
+
+class InstanceServer(QLocalServer):
+    # Receives the URLs that later launches pass to forward_to_running_instance.
+    urlsReceived = pyqtSignal(list, str)
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSocketOptions(QLocalServer.UserAccessOption); self.newConnection.connect(self.accept_connections)
+    def start(self, urls):
+        # Returns False if another instance is already listening, after handing it the URLs. That happens when two
+        # launches both pass the early check in forward_to_running_instance while still importing QtWebEngine.
+        if self.listen(INSTANCE_NAME): return True
+        if forward_to_running_instance(urls): return False
+        # Nobody answered, so the socket was left behind by a crashed instance.
+        QLocalServer.removeServer(INSTANCE_NAME); self.listen(INSTANCE_NAME)
+        return True
+    def accept_connections(self):
+        while self.hasPendingConnections():
+            socket = self.nextPendingConnection(); socket.data = b""
+            socket.readyRead.connect(lambda s=socket: setattr(s, 'data', s.data + bytes(s.readAll())))
+            socket.disconnected.connect(lambda s=socket: self.on_disconnected(s))
+    def on_disconnected(self, socket):
+        data = socket.data + bytes(socket.readAll()); socket.deleteLater()
+        try: message = json.loads(data)
+        except ValueError: return
+        if not isinstance(message, dict) or not isinstance(message.get('urls', []), list): return
+        self.urlsReceived.emit([str(url) for url in message.get('urls', [])], str(message.get('cwd', '')))
+
+class LazyTab(QWidget):
+    # Placeholder for a restored tab; it is replaced by a real view the first time it is activated.
+    def __init__(self, qurl, title, history=None, parent=None):
+        super().__init__(parent); self._url = QUrl(qurl); self._title = title; self.history = history
+    def url(self): return self._url
+    def title(self): return self._title
 
 class SecureBrowser(QMainWindow):
-    def __init__(self, db_manager):
+    ESTIMATED_TAB_MEMORY_MB = 150; SESSION_SAVE_DELAY_MS = 1000
+    ICONS = {'back_btn': 'back.png', 'forward_btn': 'forward.png', 'reload_btn': 'reload.png', 'home_btn': 'home.png',
+             'add_bookmark_btn': 'star.png', 'manage_bookmarks_btn': 'bookmark.png', 'history_btn': 'history.png',
+             'downloads_btn': 'download.png', 'settings_btn': 'settings.png'}
+    urlIndexLoaded = pyqtSignal(object)
+    filterEngineLoaded = pyqtSignal(object)
+    # Windows share one profile, config and DatabaseManager; they are ordered by when they were last active.
+    windows = []; next_window_id = 0; next_session_id = 1; cache_warmer = None; memory_timer = None; downloads = None
+    def __init__(self, db_manager, opener=None, session=None):
         super().__init__()
-        self.db = db_manager; self.config = configparser.ConfigParser(); self.config.read('config.ini')
-        use_cache = self.config.getboolean('performance', 'persistent_cache', fallback=False)
-        profile_name = "TiwutPersistentProfile" if use_cache else "TiwutVolatileProfile"
-        self.profile = QWebEngineProfile(profile_name, self)
-        if use_cache:
-            cache_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), "cache")
-            self.profile.setCachePath(cache_path); self.profile.setHttpCacheType(QWebEngineProfile.DiskHttpCache)
-        else:
-            self.profile.setHttpCacheType(QWebEngineProfile.MemoryHttpCache)
-        self.apply_cookie_policy()
-        
-        self.downloads_dialog = DownloadsDialog(self)
+        # Only what the first navigation needs is built here; dialogs, icons, the omnibox index and
+        # the filter lists are set up in finish_startup once the window has painted.
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self.db = db_manager; self.primary = opener is None
+        if opener is None:
+            self.config = configparser.ConfigParser(); self.config.read('config.ini')
+            startup_profiler.mark("read config")
+            use_cache = self.config.getboolean('performance', 'persistent_cache', fallback=False)
+            profile_name = "TiwutPersistentProfile" if use_cache else "TiwutVolatileProfile"
+            self.profile = QWebEngineProfile(profile_name, self)
+            if use_cache:
+                cache_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), "cache")
+                self.profile.setCachePath(cache_path); self.profile.setHttpCacheType(QWebEngineProfile.DiskHttpCache)
+            else:
+                self.profile.setHttpCacheType(QWebEngineProfile.MemoryHttpCache)
+            self.apply_cache_size(); self.apply_cookie_policy()
+        else: self.config = opener.config; self.profile = opener.profile
+        self.filter_engine = opener.filter_engine if opener else None
+        self.painted = False; self.last_activity = time.monotonic()
+        self.window_id = SecureBrowser.next_window_id; SecureBrowser.next_window_id += 1; SecureBrowser.windows.insert(0, self)
         self.profile.downloadRequested.connect(self.on_download_requested)
+        startup_profiler.mark("create profile")
+        if opener is None and self.config.getboolean('privacy', 'content_blocking', fallback=True):
+            # Unpickling the compiled lists is fast enough to block the first navigation; compiling is left to finish_startup.
+            self.filter_engine = self.load_filter_engine(cached_only=True)
+            if self.filter_engine is not None: startup_profiler.mark(f"load cached content filters ({len(self.filter_engine)} rules)")
         
         self.setWindowTitle("Tiwut Secure Browser"); self.setMinimumSize(1024, 768)
         self.tabs = QTabWidget(); self.tabs.setTabsClosable(True); self.tabs.setMovable(True)
@@ -200,18 +1401,16 @@ class SecureBrowser(QMainWindow):
         self.icons_dir = os.path.dirname(os.path.realpath(__file__))
         nav_bar = QToolBar("Navigation"); nav_bar.setMovable(False); nav_bar.setIconSize(QSize(22, 22)); self.addToolBar(nav_bar)
         
-        self.back_btn = QPushButton(QIcon(os.path.join(self.icons_dir, 'icons', 'back.png')), "")
-        self.forward_btn = QPushButton(QIcon(os.path.join(self.icons_dir, 'icons', 'forward.png')), "")
-        self.reload_btn = QPushButton(QIcon(os.path.join(self.icons_dir, 'icons', 'reload.png')), "")
-        self.home_btn = QPushButton(QIcon(os.path.join(self.icons_dir, 'icons', 'home.png')), "")
-        self.add_bookmark_btn = QPushButton(QIcon(os.path.join(self.icons_dir, 'icons', 'star.png')), "")
-        self.manage_bookmarks_btn = QPushButton(QIcon(os.path.join(self.icons_dir, 'icons', 'bookmark.png')), "")
-        self.history_btn = QPushButton(QIcon(os.path.join(self.icons_dir, 'icons', 'history.png')), "")
-        self.downloads_btn = QPushButton(QIcon(os.path.join(self.icons_dir, 'icons', 'download.png')), "")
-        self.add_tab_btn = QPushButton("+")
-        self.settings_btn = QPushButton(QIcon(os.path.join(self.icons_dir, 'icons', 'settings.png')), "")
+        self.back_btn = QPushButton(); self.forward_btn = QPushButton(); self.reload_btn = QPushButton(); self.home_btn = QPushButton()
+        self.add_bookmark_btn = QPushButton(); self.manage_bookmarks_btn = QPushButton(); self.history_btn = QPushButton()
+        self.downloads_btn = QPushButton(); self.add_tab_btn = QPushButton("+"); self.settings_btn = QPushButton()
+        for name in self.ICONS: getattr(self, name).setMinimumSize(QSize(40, 36))
         
         self.url_bar = QLineEdit()
+        self.suggestions = QStandardItemModel(self)
+        self.completer = QCompleter(self.suggestions, self); self.completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.completer.setCompletionRole(Qt.UserRole); self.completer.setMaxVisibleItems(8)
+        self.url_bar.setCompleter(self.completer)
         nav_bar.addWidget(self.back_btn); nav_bar.addWidget(self.forward_btn); nav_bar.addWidget(self.reload_btn); nav_bar.addWidget(self.home_btn)
         nav_bar.addWidget(self.url_bar)
         nav_bar.addWidget(self.add_bookmark_btn)
@@ -225,19 +1424,70 @@ class SecureBrowser(QMainWindow):
         self.add_bookmark_btn.clicked.connect(self.add_bookmark)
         self.manage_bookmarks_btn.clicked.connect(self.show_bookmarks)
         self.history_btn.clicked.connect(self.show_history)
-        self.downloads_btn.clicked.connect(self.downloads_dialog.show)
+        self.downloads_btn.clicked.connect(lambda: self.downloads_dialog.show())
         self.settings_btn.clicked.connect(self.open_settings)
         self.add_tab_btn.clicked.connect(lambda: self.add_new_tab())
         self.url_bar.returnPressed.connect(self.navigate_to_url)
+        self.url_bar.textEdited.connect(self.update_suggestions)
+        self.completer.activated[str].connect(self.on_suggestion_activated)
+        self.urlIndexLoaded.connect(self.on_url_index_loaded); self.filterEngineLoaded.connect(self.on_filter_engine_loaded)
         
         self.status_bar = QStatusBar(); self.setStatusBar(self.status_bar)
         self.progress_bar = QProgressBar(); self.progress_bar.setMaximumWidth(200); self.progress_bar.setTextVisible(False)
         self.status_bar.addPermanentWidget(self.progress_bar)
-        if not self.restore_session():
+        self.blocked_label = QLabel(); self.status_bar.addPermanentWidget(self.blocked_label)
+        startup_profiler.mark("build window")
+        self.dirty_tabs = set(); self.closed_tabs = set(); self.session_layout_changed = False
+        self.session_timer = QTimer(self); self.session_timer.setSingleShot(True); self.session_timer.setInterval(self.SESSION_SAVE_DELAY_MS)
+        self.session_timer.timeout.connect(self.save_session)
+        self.tabs.tabBar().tabMoved.connect(lambda *_: self.schedule_session_save())
+        if not (self.restore_tabs(session) if session else self.primary and self.restore_session()):
             self.add_new_tab(QUrl(self.config.get('settings', 'homepage', fallback='https://www.google.com')), "Startseite")
+        startup_profiler.mark("start first navigation")
+        if SecureBrowser.memory_timer is None:
+            # One timer for all windows, owned by the shared profile so that it outlives the window that created it.
+            SecureBrowser.memory_timer = QTimer(self.profile); SecureBrowser.memory_timer.timeout.connect(SecureBrowser.enforce_memory_budget)
+            SecureBrowser.memory_timer.start(30000)
         self.showMaximized()
+        startup_profiler.mark("show window")
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.painted:
+            self.painted = True; startup_profiler.mark("first paint"); QTimer.singleShot(0, self.finish_startup)
+    def finish_startup(self):
+        self.load_icons(); startup_profiler.mark("load icons", deferred=True)
+        if not self.primary: return
+        self.db.prune_page_loads(); self.db.begin_url_index_rebuild(); self.apply_cache_warming()
+        max_entries = self.config.getint('performance', 'omnibox_index_entries', fallback=UrlIndex.MAX_ENTRIES)
+        threading.Thread(target=lambda: self.urlIndexLoaded.emit(self.db.build_url_index(max_entries)), name="UrlIndexLoader", daemon=True).start()
+        if self.filter_engine is None and self.config.getboolean('privacy', 'content_blocking', fallback=True):
+            threading.Thread(target=lambda: self.filterEngineLoaded.emit(self.load_filter_engine()), name="FilterLoader", daemon=True).start()
+    def load_icons(self):
+        for name, icon in self.ICONS.items(): getattr(self, name).setIcon(QIcon(os.path.join(self.icons_dir, 'icons', icon)))
+    def on_url_index_loaded(self, index):
+        self.db.install_url_index(index); startup_profiler.mark(f"load omnibox index ({len(index)} entries)", deferred=True)
+    def on_filter_engine_loaded(self, engine):
+        if engine is None: return
+        if SecureBrowser.cache_warmer is not None: SecureBrowser.cache_warmer.set_filter_engine(engine)
+        for window in SecureBrowser.windows:
+            window.filter_engine = engine
+            for i in range(window.tabs.count()):
+                if isinstance(window.tabs.widget(i), QWebEngineView): window.tabs.widget(i).page().blocker.engine = engine
+        startup_profiler.mark(f"load content filters ({len(engine)} rules)", deferred=True)
+    @property
+    def downloads_dialog(self):
+        # Downloads belong to the shared profile, so one top-level dialog tracks them for every window
+        # and keeps running when the window that started a download is closed.
+        if SecureBrowser.downloads is None: SecureBrowser.downloads = DownloadsDialog(self.db, self.config)
+        return SecureBrowser.downloads
 
     def on_download_requested(self, download: QWebEngineDownloadItem):
+        # Every window is connected to the shared profile; the one showing the page handles the download.
+        # Pages no window shows, such as the cache warmer's, may not start downloads.
+        owner = next((window for window in SecureBrowser.windows if window.owns_page(download.page())), None)
+        if owner is None and self is SecureBrowser.windows[0]: download.cancel()
+        if owner is not self: return
         path, _ = QFileDialog.getSaveFileName(self, "Save File", download.path())
         if path:
             download.setPath(path)
@@ -257,53 +1507,222 @@ class SecureBrowser(QMainWindow):
     def show_history(self):
         dialog = HistoryDialog(self.db, self); dialog.exec_()
 
-    def add_new_tab(self, qurl=None, label="Neuer Tab"):
+    def create_browser(self, qurl, history=None):
         browser = QWebEngineView(); page = CustomWebEnginePage(self.profile, self, browser); browser.setPage(page)
-        if qurl is None: qurl = QUrl(self.config.get('settings', 'homepage', fallback='https://www.google.com'))
-        browser.setUrl(qurl); i = self.tabs.addTab(browser, label); self.tabs.setCurrentIndex(i)
+        page.blocker = RequestBlocker(self.filter_engine, page); page.setUrlRequestInterceptor(page.blocker)
+        page.blocker.blockedCountChanged.connect(lambda n, b=browser: self.update_blocked_count(n, b))
+        browser.last_active = time.monotonic(); browser.restore_scroll = None; browser.load_started = None
         browser.urlChanged.connect(lambda q, b=browser: self.update_url_bar(q, b))
         browser.loadProgress.connect(lambda p, b=browser: self.update_progress_bar(p, b))
         browser.titleChanged.connect(lambda t, b=browser: self.update_tab_title(t, b))
-        browser.loadFinished.connect(lambda _, b=browser: self.on_load_finished(b)); return page
-    def on_load_finished(self, browser):
+        browser.loadStarted.connect(lambda b=browser: self.on_load_started(b))
+        browser.loadFinished.connect(lambda ok, b=browser: self.on_load_finished(b, ok))
+        browser.urlChanged.connect(lambda q, b=browser: self.schedule_session_save(b))
+        browser.titleChanged.connect(lambda t, b=browser: self.schedule_session_save(b))
+        if history: QDataStream(QByteArray(history)) >> browser.history()
+        else: browser.setUrl(qurl)
+        return browser
+    def add_new_tab(self, qurl=None, label="Neuer Tab"):
+        if qurl is None: qurl = QUrl(self.config.get('settings', 'homepage', fallback='https://www.google.com'))
+        browser = self.create_browser(qurl); browser.session_id = self.new_session_id()
+        i = self.tabs.addTab(browser, label); self.tabs.setCurrentIndex(i); self.schedule_session_save(browser); return browser.page()
+    def add_lazy_tab(self, qurl, label="Laden...", history=None, session_id=None):
+        placeholder = LazyTab(qurl, label, history); placeholder.session_id = session_id or self.new_session_id()
+        self.tabs.addTab(placeholder, label); return placeholder
+    def materialize_tab(self, i):
+        placeholder = self.tabs.widget(i); browser = self.create_browser(placeholder.url(), placeholder.history)
+        browser.session_id = placeholder.session_id
+        self.tabs.blockSignals(True)
+        self.tabs.insertTab(i, browser, self.tabs.tabText(i)); self.tabs.removeTab(i + 1); self.tabs.setCurrentIndex(i)
+        self.tabs.blockSignals(False)
+        placeholder.deleteLater()
+    def on_load_started(self, browser):
+        browser.load_started = self.last_activity = time.monotonic()
+    def on_load_finished(self, browser, ok=True):
+        startup_profiler.mark_once("finish first navigation")
+        self.record_page_load(browser, ok)
         self.update_nav_buttons(browser)
+        if browser.restore_scroll is not None:
+            scroll = browser.restore_scroll; browser.restore_scroll = None
+            browser.page().runJavaScript(f"window.scrollTo({scroll.x()}, {scroll.y()})")
         url = browser.url().toString(); title = browser.title()
         if browser == self.active_browser() and title and url and "about:blank" not in url: self.db.add_history_entry(url, title)
+    def record_page_load(self, browser, ok):
+        if browser.load_started is None: return
+        url = browser.url()
+        if url.scheme() not in ('http', 'https'): browser.load_started = None; return
+        sample = {'timestamp': time.time(), 'url': url.toString(), 'domain': url.host(), 'ok': int(ok),
+                  'load_ms': (time.monotonic() - browser.load_started) * 1000,
+                  'cache_mode': 'disk' if self.profile.httpCacheType() == QWebEngineProfile.DiskHttpCache else 'memory',
+                  'cookie_policy': self.config.getint('privacy', 'cookie_policy', fallback=0)}
+        browser.load_started = None
+        if not ok: self.db.add_page_load(sample); return
+        def store(timing):
+            try: sample.update(json.loads(timing) if timing else {})
+            except ValueError: pass
+            self.db.add_page_load(sample)
+        browser.page().runJavaScript(PAGE_TIMING_SCRIPT, QWebEngineScript.ApplicationWorld, store)
+    def show_performance(self):
+        dialog = PerformanceDialog(self.db, self); dialog.exec_()
     def open_settings(self):
         dialog = SettingsDialog(self.config, self.db, self)
         if dialog.exec_() == QDialog.Accepted:
             with open('config.ini', 'w') as configfile: self.config.write(configfile)
             self.statusBar().showMessage("Settings saved. Some changes require a restart.", 3000)
-            self.apply_cookie_policy()
+            self.apply_cookie_policy(); self.apply_cache_size(); self.apply_cache_warming()
+    def apply_cache_size(self):
+        # 0 leaves the size to Chromium, which picks a limit based on free disk space.
+        self.profile.setHttpCacheMaximumSize(self.config.getint('performance', 'cache_size_mb', fallback=0) * 1024 * 1024)
+    def apply_cache_warming(self):
+        enabled = self.profile.httpCacheType() == QWebEngineProfile.DiskHttpCache and self.config.getboolean('performance', 'cache_warming', fallback=False)
+        if enabled and SecureBrowser.cache_warmer is None:
+            SecureBrowser.cache_warmer = CacheWarmer(self.profile, self.db, self.config.getint('performance', 'cache_warm_count', fallback=20))
+            SecureBrowser.cache_warmer.set_filter_engine(self.filter_engine)
+        elif not enabled and SecureBrowser.cache_warmer is not None: SecureBrowser.cache_warmer.shutdown(); SecureBrowser.cache_warmer = None
+    @classmethod
+    def is_idle(cls, seconds):
+        now = time.monotonic()
+        return all(now - window.last_activity >= seconds and not any(getattr(window.tabs.widget(i), 'load_started', None) is not None for i in range(window.tabs.count()))
+                   for window in cls.windows)
+    def owns_page(self, page):
+        return any(isinstance(self.tabs.widget(i), QWebEngineView) and self.tabs.widget(i).page() == page for i in range(self.tabs.count()))
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.ActivationChange and self.isActiveWindow() and self in SecureBrowser.windows:
+            SecureBrowser.windows.remove(self); SecureBrowser.windows.insert(0, self)
+    def open_urls(self, urls, working_directory=""):
+        # Called for URLs passed on the command line, including those forwarded by later launches.
+        if not urls: SecureBrowser(self.db, opener=self); return
+        for url in urls: self.add_new_tab(QUrl.fromUserInput(url, working_directory))
+        if self.isMinimized(): self.showMaximized()
+        self.raise_(); self.activateWindow()
     def clear_cache(self): self.profile.clearHttpCache(); self.statusBar().showMessage("Cache has been cleared.", 2000)
     def apply_cookie_policy(self):
         policy = self.config.getint('privacy', 'cookie_policy', fallback=0)
         cookie_store = self.profile.cookieStore()
+        # Without a filter every cookie is allowed, which avoids a Python call per cookie access.
         if policy == 1: cookie_store.setCookieFilter(lambda request: False)
-        else: cookie_store.setCookieFilter(lambda request: True)
+        else: cookie_store.setCookieFilter(None)
     def closeEvent(self, event):
-        if self.config.getboolean('tabs', 'restore_session', fallback=False):
-            urls = [self.tabs.widget(i).url().toString() for i in range(self.tabs.count())]
-            if not self.config.has_section('session'): self.config.add_section('session')
-            self.config.set('session', 'open_tabs', ','.join(urls))
-        else:
-            if self.config.has_option('session', 'open_tabs'): self.config.set('session', 'open_tabs', '')
+        self.session_timer.stop(); SecureBrowser.windows.remove(self)
+        if SecureBrowser.windows:
+            # Other windows stay open: this window's tabs leave the session and the shared profile moves on.
+            self.db.save_session([], closed=[self.tabs.widget(i).session_id for i in range(self.tabs.count())] + list(self.closed_tabs))
+            if self.profile.parent() is self: self.profile.setParent(SecureBrowser.windows[0])
+            event.accept(); return
+        if self.config.getboolean('tabs', 'restore_session', fallback=False): self.save_session(full=True)
+        else: self.db.clear_session()
         if self.config.getint('privacy', 'cookie_policy', fallback=0) == 2: self.profile.cookieStore().deleteAllCookies()
         with open('config.ini', 'w') as configfile: self.config.write(configfile)
+        self.db.close()
+        # The timer, the cache warmer and the downloads dialog belong to the profile, which goes away with the last window.
+        if SecureBrowser.memory_timer is not None: SecureBrowser.memory_timer.stop(); SecureBrowser.memory_timer = None
+        if SecureBrowser.downloads is not None: SecureBrowser.downloads.close(); SecureBrowser.downloads.deleteLater(); SecureBrowser.downloads = None
+        if SecureBrowser.cache_warmer is not None: SecureBrowser.cache_warmer.shutdown(); SecureBrowser.cache_warmer = None
         event.accept()
     def restore_session(self):
-        if self.config.getboolean('tabs', 'restore_session', fallback=False):
-            urls = self.config.get('session', 'open_tabs', fallback='').split(',')
-            urls = [url for url in urls if url]
-            if urls:
-                for url in urls: self.add_new_tab(QUrl(url), "Laden..."); return True
-        return False
+        if not self.config.getboolean('tabs', 'restore_session', fallback=False):
+            self.db.clear_session(); return False
+        rows = self.db.get_session()
+        # Sessions used to be saved as a comma-joined open_tabs entry in config.ini.
+        legacy = [url for url in self.config.get('session', 'open_tabs', fallback='').split(',') if url]
+        self.config.remove_section('session')
+        if not rows and legacy: rows = [(None, url, QUrl(url).host() or "Laden...", None, False, 0) for url in legacy]
+        if not rows: return False
+        SecureBrowser.next_session_id = max(row[0] or 0 for row in rows) + 1
+        windows = {}
+        for tab_id, url, title, history, is_current, window_id in rows: windows.setdefault(window_id, []).append((tab_id, url, title, history, is_current))
+        first, *others = windows.values()
+        self.restore_tabs(first)
+        for tabs in others: SecureBrowser(self.db, opener=self, session=tabs)
+        if legacy: self.schedule_session_save(full=True)
+        return True
+    def restore_tabs(self, rows):
+        # Every tab is a placeholder until it is shown, so restoring hundreds of tabs only costs one query.
+        self.tabs.blockSignals(True); self.tabs.setUpdatesEnabled(False)
+        current = 0
+        for i, (tab_id, url, title, history, is_current) in enumerate(rows):
+            self.add_lazy_tab(QUrl(url), title or "Laden...", history, tab_id)
+            if is_current: current = i
+        self.tabs.setCurrentIndex(current)
+        self.tabs.setUpdatesEnabled(True); self.tabs.blockSignals(False)
+        self.tab_changed(current)
+        return True
+    def new_session_id(self):
+        session_id = SecureBrowser.next_session_id; SecureBrowser.next_session_id += 1; return session_id
+    def schedule_session_save(self, widget=None, full=False):
+        # Changes are collected and written together at most SESSION_SAVE_DELAY_MS later. The timer is not
+        # restarted on every change, so continuous navigation still gets saved.
+        if widget is not None: self.dirty_tabs.add(widget)
+        else: self.session_layout_changed = True
+        if full: self.dirty_tabs.update(self.tabs.widget(i) for i in range(self.tabs.count()))
+        if not self.session_timer.isActive(): self.session_timer.start()
+    def save_session(self, full=False):
+        if full: self.dirty_tabs.update(self.tabs.widget(i) for i in range(self.tabs.count()))
+        dirty, closed, layout_changed = self.dirty_tabs, self.closed_tabs, self.session_layout_changed or full
+        self.dirty_tabs = set(); self.closed_tabs = set(); self.session_layout_changed = False
+        if not self.config.getboolean('tabs', 'restore_session', fallback=False): return
+        widgets = [self.tabs.widget(i) for i in range(self.tabs.count())]
+        tabs = [(w.session_id, w.url().toString(), w.title(), self.serialize_history(w) if isinstance(w, QWebEngineView) else w.history) for w in widgets if w in dirty]
+        positions = [(i, w.session_id) for i, w in enumerate(widgets)] if layout_changed else None
+        current = self.tabs.currentWidget()
+        self.db.save_session(tabs, positions, closed, current.session_id if current else None, self.window_id)
+    @staticmethod
+    def serialize_history(browser):
+        data = QByteArray(); QDataStream(data, QIODevice.WriteOnly) << browser.history(); return bytes(data)
     def close_tab(self, i):
         if self.tabs.count() < 2: self.close()
-        else: self.tabs.removeTab(i)
+        else:
+            widget = self.tabs.widget(i); self.tabs.removeTab(i); widget.deleteLater()
+            self.dirty_tabs.discard(widget); self.closed_tabs.add(widget.session_id); self.schedule_session_save()
     def tab_changed(self, i):
+        if i > -1 and isinstance(self.tabs.widget(i), LazyTab): self.materialize_tab(i)
+        if i > -1: self.schedule_session_save(); self.last_activity = time.monotonic()
         if i > -1 and self.active_browser():
-            self.update_url_bar(self.active_browser().url()); self.update_nav_buttons(self.active_browser())
+            browser = self.active_browser(); browser.last_active = time.monotonic()
+            if browser.page().lifecycleState() != QWebEnginePage.LifecycleState.Active: browser.page().setLifecycleState(QWebEnginePage.LifecycleState.Active)
+            self.update_url_bar(browser.url()); self.update_nav_buttons(browser)
+            self.update_blocked_count(browser.page().blocker.blocked, browser)
+    def load_filter_engine(self, cached_only=False):
+        filters_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), "filters")
+        paths = sorted(os.path.join(filters_dir, name) for name in os.listdir(filters_dir) if name.endswith(".txt")) if os.path.isdir(filters_dir) else []
+        suffix_path = os.path.join(filters_dir, "public_suffix_list.dat")
+        return FilterEngine.load(paths, os.path.join(filters_dir, "compiled.cache"), suffix_path if os.path.isfile(suffix_path) else None, cached_only) if paths else None
+    def update_blocked_count(self, count, browser):
+        if browser == self.active_browser(): self.blocked_label.setText(f"{count} blocked" if count else "")
+    @classmethod
+    def enforce_memory_budget(cls):
+        # Background tabs idle for longer than freeze_after_seconds are frozen; while the renderers
+        # use more than memory_budget_mb, the least recently used background tabs are discarded.
+        # The budget covers all windows together, and a window's current tab counts as in use.
+        if not cls.windows: return
+        config = cls.windows[0].config
+        budget = config.getint('performance', 'memory_budget_mb', fallback=2048)
+        freeze_after = config.getint('performance', 'freeze_after_seconds', fallback=300)
+        active = {window.active_browser() for window in cls.windows}; now = time.monotonic()
+        browsers = [window.tabs.widget(i) for window in cls.windows for i in range(window.tabs.count()) if isinstance(window.tabs.widget(i), QWebEngineView)]
+        background = sorted((b for b in browsers if b not in active and not b.page().recentlyAudible()), key=lambda b: b.last_active)
+        for browser in background:
+            if browser.page().lifecycleState() == QWebEnginePage.LifecycleState.Active and now - browser.last_active > freeze_after:
+                browser.page().setLifecycleState(QWebEnginePage.LifecycleState.Frozen)
+        pages_per_pid = collections.Counter(b.page().renderProcessPid() for b in browsers)
+        memory = {pid: cls.process_memory_mb(pid) for pid in pages_per_pid if pid}
+        usage = sum(memory.values())
+        for browser in background:
+            if usage <= budget: break
+            page = browser.page(); pid = page.renderProcessPid()
+            if page.lifecycleState() == QWebEnginePage.LifecycleState.Discarded or not pid: continue
+            browser.restore_scroll = page.scrollPosition(); page.setLifecycleState(QWebEnginePage.LifecycleState.Discarded)
+            usage -= memory[pid] / pages_per_pid[pid]
+    @staticmethod
+    def process_memory_mb(pid):
+        # Resident memory of a renderer process; pages without /proc count as ESTIMATED_TAB_MEMORY_MB.
+        try:
+            with open(f"/proc/{pid}/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"): return int(line.split()[1]) / 1024
+        except OSError: pass
+        return SecureBrowser.ESTIMATED_TAB_MEMORY_MB
     def active_browser(self): return self.tabs.currentWidget()
     def navigate_home(self):
         if self.active_browser(): self.active_browser().setUrl(QUrl(self.config.get('settings', 'homepage', fallback='https://www.google.com')))
@@ -317,6 +1736,14 @@ class SecureBrowser(QMainWindow):
             if not (url_text.startswith("https://") or url_text.startswith("http://")): url_text = "https://" + url_text
             url = QUrl(url_text)
         self.active_browser().setUrl(url)
+    def update_suggestions(self, text):
+        self.last_activity = time.monotonic()
+        self.suggestions.clear()
+        for url, title in self.db.url_index.search(text):
+            item = QStandardItem(f"{title} - {url}" if title else url); item.setData(url, Qt.UserRole); self.suggestions.appendRow(item)
+        if self.suggestions.rowCount(): self.completer.complete()
+        else: self.completer.popup().hide()
+    def on_suggestion_activated(self, url): self.url_bar.setText(url); self.navigate_to_url()
     def update_url_bar(self, q, browser=None):
         if browser is None or browser == self.active_browser():
             self.url_bar.setText(q.toString()); self.url_bar.setCursorPosition(0)
@@ -334,10 +1761,18 @@ class SecureBrowser(QMainWindow):
             self.back_btn.setEnabled(history.canGoBack()); self.forward_btn.setEnabled(history.canGoForward())
 
 if __name__ == "__main__":
+    startup_profiler.enabled = '--profile-startup' in sys.argv
+    startup_profiler.mark("import modules")
     QApplication.setAttribute(Qt.AA_EnableHighDpiScaling)
     app = QApplication(sys.argv)
     app.setStyleSheet(FINAL_DARK_STYLE)
+    instance_server = InstanceServer(app)
+    if not instance_server.start(url_arguments(sys.argv)): sys.exit(0)
+    instance_server.urlsReceived.connect(lambda urls, cwd: SecureBrowser.windows and SecureBrowser.windows[0].open_urls(urls, cwd))
+    startup_profiler.mark("create QApplication")
     
     db_manager = DatabaseManager()
+    startup_profiler.mark("open database")
     window = SecureBrowser(db_manager)
+    if url_arguments(sys.argv): window.open_urls(url_arguments(sys.argv), os.getcwd())
     sys.exit(app.exec_())